@@ -4,7 +4,9 @@ from Evaluation_System_APP.routes.project import project_bp
 from Evaluation_System_APP.routes.pdf import pdf_bp
 from Evaluation_System_APP.routes.admin import admin_bp
 from Evaluation_System_APP.models.user import create_default_admin
-from flask import redirect, url_for
+from Evaluation_System_APP.models.startup import run_startup_tasks
+from Evaluation_System_APP.models.inference_pool import inference_status
+from flask import redirect, url_for, jsonify
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='')
@@ -15,10 +17,20 @@ app.register_blueprint(admin_bp, url_prefix='')
 # Create default admin on startup
 create_default_admin()
 
+# Resume interrupted jobs and warm up the detector, in the process that
+# will serve requests
+run_startup_tasks(reloader=__name__ == '__main__')
+
 # Add a route for the root URL
 @app.route('/')
 def index():
     return redirect(url_for('auth.login'))
 
+# Readiness check for load balancers
+@app.route('/ready')
+def ready():
+    status = inference_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
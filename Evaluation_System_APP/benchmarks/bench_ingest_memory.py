@@ -0,0 +1,86 @@
+"""Report peak RSS of thumbnail ingestion against page count.
+
+Run from the repository root:
+
+    python -m Evaluation_System_APP.benchmarks.bench_ingest_memory --pages 10 50 200
+
+Each measurement runs in a fresh process so peaks don't carry over between
+runs. ``--mode full`` reproduces the old whole-document conversion for
+comparison, and ``--workers`` runs the parallel ingestion path. Peak RSS is
+the larger of the ingesting process and its largest child (poppler or a
+thumbnail worker).
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from Evaluation_System_APP.benchmarks.synthetic_pdf import write_synthetic_pdf
+
+def _ingest_child(pdf_path, thumbs_dir, mode, total_pages, workers, result_queue):
+    """Generate thumbnails in a child process and report its peak RSS"""
+    from pdf2image import convert_from_path
+    from Evaluation_System_APP.config import THUMBNAIL_DPI
+    from Evaluation_System_APP.models.pdf_processor import generate_thumbnails
+
+    start = time.perf_counter()
+    if mode == 'full':
+        pages = convert_from_path(pdf_path, dpi=THUMBNAIL_DPI)
+        for i, page in enumerate(pages):
+            page.save(os.path.join(thumbs_dir, f"page_{i+1}.png"), "PNG")
+        pages = None
+    else:
+        generate_thumbnails(pdf_path, thumbs_dir, total_pages, workers=workers)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    result_queue.put((elapsed, peak_kb))
+
+def measure(pdf_path, total_pages, mode, workers=1):
+    """Run one ingestion in a fresh process and return (seconds, peak RSS in MB)"""
+    thumbs_dir = tempfile.mkdtemp(prefix='bench_thumbs_')
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        result_queue = ctx.Queue()
+        proc = ctx.Process(
+            target=_ingest_child,
+            args=(pdf_path, thumbs_dir, mode, total_pages, workers, result_queue)
+        )
+        proc.start()
+        elapsed, peak_kb = result_queue.get()
+        proc.join()
+        return elapsed, peak_kb / 1024
+    finally:
+        shutil.rmtree(thumbs_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--mode', choices=['stream', 'full'], default='stream')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--width-in', type=float, default=36)
+    parser.add_argument('--height-in', type=float, default=24)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_ingest_')
+    try:
+        print(f"{'pages':>6} {'seconds':>9} {'pages/sec':>10} {'peak RSS (MB)':>14}")
+        for total_pages in args.pages:
+            pdf_path = write_synthetic_pdf(
+                os.path.join(work_dir, f"synthetic_{total_pages}.pdf"), total_pages,
+                width_in=args.width_in, height_in=args.height_in
+            )
+            elapsed, peak_mb = measure(pdf_path, total_pages, args.mode, args.workers)
+            print(f"{total_pages:>6} {elapsed:>9.2f} {total_pages / elapsed:>10.1f} {peak_mb:>14.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
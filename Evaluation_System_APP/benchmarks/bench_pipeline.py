@@ -0,0 +1,249 @@
+"""Benchmark upload ingestion and sheet processing end to end as JSON.
+
+Run from the repository root (needs poppler, but no YOLO weights):
+
+    python -m Evaluation_System_APP.benchmarks.bench_pipeline --pages 20 --output run.json
+
+A synthetic drawing set is uploaded through process_uploaded_pdf, its
+thumbnails are generated by the ingestion job, a few sheets go through
+process_sheet one at a time, and then every sheet is processed by the
+batch job. Detection is replaced with a stub that returns --boxes boxes
+per image after --latency-ms, so runs compare the code around the model
+and need no weights. Save the JSON from two commits and diff them.
+
+Everything runs in a fresh process with the detection cache off and the
+raster cache in a scratch folder. Other settings, such as DETECTION_MODE
+or CROP_STORAGE, are read from the environment as usual. The upload is
+removed from the uploads folder afterwards.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from Evaluation_System_APP.benchmarks.synthetic_pdf import write_synthetic_pdf
+
+# Seconds between job status checks
+POLL_INTERVAL = 0.05
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux; children are poppler
+    # and thumbnail workers
+    return round(max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    ) / 1024, 1)
+
+def _latency_summary(values):
+    values = sorted(values)
+    if not values:
+        return None
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 4),
+        'p50': round(values[len(values) // 2], 4),
+        'p95': round(values[min(len(values) - 1, math.ceil(len(values) * 0.95) - 1)], 4),
+        'max': round(values[-1], 4)
+    }
+
+def stub_boxes(size, count):
+    """`count` boxes laid out on a grid over an image of `size`"""
+    import numpy as np
+    width, height = size
+    columns = max(1, math.ceil(math.sqrt(count)))
+    rows = max(1, math.ceil(count / columns))
+    cell_w, cell_h = width / columns, height / rows
+    boxes = [
+        (col * cell_w + cell_w * 0.1, row * cell_h + cell_h * 0.1,
+         col * cell_w + cell_w * 0.9, row * cell_h + cell_h * 0.9)
+        for i in range(count)
+        for row, col in [divmod(i, columns)]
+    ]
+    return np.array(boxes, dtype=float).reshape(-1, 4)
+
+def make_stub_detector(boxes_per_image, latency):
+    """Stand-in for run_yolo returning (boxes, scores) per image"""
+    import numpy as np
+    from PIL import Image
+
+    def run(images):
+        if isinstance(images, Image.Image):
+            images = [images]
+        # Inference time grows with the batch, as it does on CPU
+        time.sleep(latency * len(images))
+        return [
+            (stub_boxes(img.size, boxes_per_image), np.full(boxes_per_image, 0.9))
+            for img in images
+        ]
+    return run
+
+def _wait_for_job(upload_id, kind):
+    from Evaluation_System_APP.models.job_queue import get_job_status
+    while True:
+        job = get_job_status(upload_id, kind)
+        if not job or job['state'] not in ('queued', 'running'):
+            return job
+        time.sleep(POLL_INTERVAL)
+
+def _remove_upload(upload_id):
+    """Delete everything the benchmark upload left behind"""
+    from Evaluation_System_APP.config import UPLOAD_FOLDER, THUMBNAILS_FOLDER
+    from Evaluation_System_APP.models.content_store import unregister_upload
+    from Evaluation_System_APP.models.sheet_lock import LOCKS_FOLDER
+
+    unregister_upload(upload_id)
+    shutil.rmtree(os.path.join(THUMBNAILS_FOLDER, upload_id), ignore_errors=True)
+    for folder in (UPLOAD_FOLDER, LOCKS_FOLDER):
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            if name.startswith(upload_id):
+                path = os.path.join(folder, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+def _benchmark_child(pdf_path, args, result_queue):
+    """Run every stage in this process and report timings and memory"""
+    from werkzeug.datastructures import FileStorage
+    from Evaluation_System_APP.config import DETECTION_MODE, CROP_STORAGE, DETECTION_BATCH_SIZE
+    from Evaluation_System_APP.models import pdf_processor
+
+    pdf_processor.run_yolo = make_stub_detector(args.boxes, args.latency_ms / 1000)
+    results = {}
+    upload_id = None
+    try:
+        start = time.perf_counter()
+        with open(pdf_path, 'rb') as f:
+            success, upload_id = pdf_processor.process_uploaded_pdf(
+                FileStorage(stream=f, filename='synthetic.pdf'), None
+            )
+        if not success:
+            raise RuntimeError(upload_id)
+        results['upload'] = {
+            'seconds': round(time.perf_counter() - start, 4),
+            'peak_rss_mb': _peak_rss_mb()
+        }
+
+        start = time.perf_counter()
+        job = _wait_for_job(upload_id, 'ingest')
+        elapsed = time.perf_counter() - start
+        results['thumbnails'] = {
+            'seconds': round(elapsed, 4),
+            'pages_per_sec': round(args.pages / elapsed, 2) if job else None,
+            'errors': job['errors'] if job else [],
+            'peak_rss_mb': _peak_rss_mb()
+        }
+
+        latencies = []
+        for page_num in range(1, min(args.single_sheets, args.pages) + 1):
+            start = time.perf_counter()
+            success, error = pdf_processor.process_sheet(upload_id, page_num)
+            if not success:
+                raise RuntimeError(error)
+            latencies.append(time.perf_counter() - start)
+        results['single_sheet'] = {
+            'latency_seconds': _latency_summary(latencies),
+            'peak_rss_mb': _peak_rss_mb()
+        }
+
+        start = time.perf_counter()
+        success, error = pdf_processor.process_all_sheets(upload_id, reprocess=True)
+        if not success:
+            raise RuntimeError(error)
+        job = _wait_for_job(upload_id, 'sheets')
+        elapsed = time.perf_counter() - start
+        results['batch'] = {
+            'seconds': round(elapsed, 4),
+            'pages_per_sec': round(args.pages / elapsed, 2),
+            'errors': job['errors'],
+            # Per-stage busy time and queue depths of the sheet pipeline
+            'pipeline': job.get('pipeline'),
+            'peak_rss_mb': _peak_rss_mb()
+        }
+        results['settings'] = {
+            'detection_mode': DETECTION_MODE,
+            'crop_storage': CROP_STORAGE,
+            'detection_batch_size': DETECTION_BATCH_SIZE
+        }
+        result_queue.put((results, None))
+    except Exception as e:
+        result_queue.put((results, f"{type(e).__name__}: {e}"))
+    finally:
+        if upload_id and not args.keep:
+            _remove_upload(upload_id)
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--width-in', type=float, default=36)
+    parser.add_argument('--height-in', type=float, default=24)
+    parser.add_argument('--lines-per-page', type=int, default=400, help='drawing density')
+    parser.add_argument('--boxes', type=int, default=8, help='boxes the stub detector returns per image')
+    parser.add_argument('--latency-ms', type=float, default=50, help='stub inference time per image')
+    parser.add_argument('--single-sheets', type=int, default=3, help='sheets timed through process_sheet')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON here instead of stdout')
+    parser.add_argument('--keep', action='store_true', help="don't delete the upload afterwards")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    try:
+        pdf_path = write_synthetic_pdf(
+            os.path.join(work_dir, 'synthetic.pdf'), args.pages,
+            width_in=args.width_in, height_in=args.height_in,
+            lines_per_page=args.lines_per_page, seed=args.seed
+        )
+        # The child reads these when it imports the config; stale cache
+        # hits would hide the work being measured, and OCR prefetching
+        # would send every figure to Azure while the pipeline is timed
+        os.environ['DETECTION_CACHE'] = 'false'
+        os.environ['PRELOAD_DETECTOR'] = 'false'
+        os.environ['OCR_PREFETCH'] = 'false'
+        os.environ['RASTER_CACHE_FOLDER'] = os.path.join(work_dir, 'raster_cache')
+
+        ctx = multiprocessing.get_context('spawn')
+        result_queue = ctx.Queue()
+        proc = ctx.Process(target=_benchmark_child, args=(pdf_path, args, result_queue))
+        proc.start()
+        results, error = result_queue.get()
+        proc.join()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'commit': _git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'parameters': vars(args),
+        'results': results,
+        'error': error
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if error:
+        raise SystemExit(error)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare thumbnail size and render time across encodings.
+
+Run from the repository root:
+
+    python -m Evaluation_System_APP.benchmarks.bench_thumbnail_encoding --pages 10
+
+The baseline is the original output: a full 72 DPI page saved as a plain PNG.
+Every other option renders straight to --width pixels and encodes with the
+thumbnail encoder.
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from pdf2image import convert_from_path
+from Evaluation_System_APP.config import THUMBNAIL_DPI
+from Evaluation_System_APP.models.image_encoding import encode_image
+from Evaluation_System_APP.benchmarks.synthetic_pdf import write_synthetic_pdf
+
+def _render(pdf_path, page_num, width):
+    start = time.perf_counter()
+    page = convert_from_path(
+        pdf_path, dpi=THUMBNAIL_DPI,
+        first_page=page_num, last_page=page_num,
+        size=(width, None) if width else None,
+        thread_count=1
+    )[0]
+    return page, time.perf_counter() - start
+
+def run(pdf_path, pages, width, quality):
+    """Return {option: (avg bytes, avg render ms, avg encode ms)}"""
+    options = {
+        'baseline png @72dpi': (None, 'legacy'),
+        f'png optimized @{width}px': (width, 'png'),
+        f'webp q{quality} @{width}px': (width, 'webp'),
+        f'jpeg q{quality} @{width}px': (width, 'jpeg'),
+    }
+    results = {}
+    for name, (option_width, fmt) in options.items():
+        total_bytes = render_s = encode_s = 0.0
+        for page_num in range(1, pages + 1):
+            page, elapsed = _render(pdf_path, page_num, option_width)
+            render_s += elapsed
+
+            start = time.perf_counter()
+            if fmt == 'legacy':
+                buf = io.BytesIO()
+                page.save(buf, "PNG")
+                data = buf.getvalue()
+            else:
+                data = encode_image(page, fmt, quality=quality, max_bytes=0)
+            encode_s += time.perf_counter() - start
+            total_bytes += len(data)
+            page.close()
+        results[name] = (
+            total_bytes / pages, render_s * 1000 / pages, encode_s * 1000 / pages
+        )
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--width', type=int, default=600)
+    parser.add_argument('--quality', type=int, default=75)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_thumbs_')
+    try:
+        pdf_path = write_synthetic_pdf(os.path.join(work_dir, 'synthetic.pdf'), args.pages)
+        results = run(pdf_path, args.pages, args.width, args.quality)
+        print(f"{'option':<26} {'KB/page':>9} {'render ms':>10} {'encode ms':>10}")
+        for name, (avg_bytes, render_ms, encode_ms) in results.items():
+            print(f"{name:<26} {avg_bytes / 1024:>9.1f} {render_ms:>10.1f} {encode_ms:>10.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare per-sheet detection latency with and without the model registry.
+
+Run from the repository root (needs ultralytics and the YOLO weights):
+
+    python -m Evaluation_System_APP.benchmarks.bench_yolo_load --sheets 5
+
+"reload" builds a new YOLO model for every sheet, as process_sheet used to.
+"cached" goes through get_yolo(), which loads the weights once per process.
+"batched" sends --batch-size sheets per forward pass, as batch processing does.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from pdf2image import convert_from_path
+from Evaluation_System_APP.config import PDF_DPI, YOLO_WEIGHTS
+from Evaluation_System_APP.models.pdf_processor import _load_yolo, run_yolo, detect_boxes
+from Evaluation_System_APP.benchmarks.synthetic_pdf import write_synthetic_pdf
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sheets', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=4)
+    args = parser.parse_args()
+
+    if not os.path.exists(YOLO_WEIGHTS):
+        raise SystemExit(f"YOLO weights not found at {YOLO_WEIGHTS}")
+
+    work_dir = tempfile.mkdtemp(prefix='bench_yolo_')
+    try:
+        pdf_path = write_synthetic_pdf(os.path.join(work_dir, 'synthetic.pdf'), args.sheets)
+        sheets = [
+            convert_from_path(pdf_path, dpi=PDF_DPI, first_page=n, last_page=n, thread_count=1)[0]
+            for n in range(1, args.sheets + 1)
+        ]
+
+        timings = {'reload': [], 'cached': []}
+        for sheet in sheets:
+            start = time.perf_counter()
+            _load_yolo(YOLO_WEIGHTS)(sheet)
+            timings['reload'].append(time.perf_counter() - start)
+        for sheet in sheets:
+            start = time.perf_counter()
+            run_yolo(sheet)
+            timings['cached'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, len(sheets), args.batch_size):
+            detect_boxes(sheets[i:i + args.batch_size])
+        batched = time.perf_counter() - start
+
+        print(f"{'mode':<8} {'first (s)':>10} {'mean (s)':>10} {'mean after first (s)':>22}")
+        for mode, values in timings.items():
+            rest = values[1:] or values
+            print(f"{mode:<8} {values[0]:>10.3f} {sum(values) / len(values):>10.3f} "
+                  f"{sum(rest) / len(rest):>22.3f}")
+        print()
+        cached_total = sum(timings['cached'])
+        print(f"pages/sec single-image: {len(sheets) / cached_total:.2f}")
+        print(f"pages/sec batched ({args.batch_size}/pass): {len(sheets) / batched:.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Check that the ONNX detector finds the same boxes as the PyTorch model.
+
+Run from the repository root (needs ultralytics, onnxruntime and the YOLO weights):
+
+    python -m Evaluation_System_APP.benchmarks.check_onnx_parity --pdf drawings.pdf --pages 5
+
+Each page is run through both backends and the boxes are paired by IoU.
+The check fails if a box has no partner or a paired corner moves by more
+than --tolerance pixels. Per-sheet latency of both backends is printed too.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from pdf2image import convert_from_path
+from Evaluation_System_APP.config import PDF_DPI, YOLO_WEIGHTS, ONNX_QUANTIZE
+from Evaluation_System_APP.models.onnx_detector import OnnxDetector, export_onnx
+from Evaluation_System_APP.models.pdf_processor import _load_yolo, _boxes_and_scores
+from Evaluation_System_APP.benchmarks.synthetic_pdf import write_synthetic_pdf
+
+def box_iou(a, b):
+    w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = w * h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def match_boxes(reference, candidate, min_iou):
+    """Greedily pair boxes; returns (pairs, unmatched reference, unmatched candidate)"""
+    pairs, missing, used = [], [], set()
+    for i, box in enumerate(reference):
+        scored = [(box_iou(box, other), j) for j, other in enumerate(candidate) if j not in used]
+        best_iou, best = max(scored, default=(0.0, None))
+        if best is None or best_iou < min_iou:
+            missing.append(i)
+            continue
+        used.add(best)
+        pairs.append((i, best))
+    extra = [j for j in range(len(candidate)) if j not in used]
+    return pairs, missing, extra
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pdf', help='drawing set to check (default: a synthetic PDF)')
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--quantize', action='store_true', default=ONNX_QUANTIZE)
+    parser.add_argument('--min-iou', type=float, default=0.9)
+    parser.add_argument('--tolerance', type=float, default=4.0, help='max corner shift in pixels')
+    args = parser.parse_args()
+
+    if not os.path.exists(YOLO_WEIGHTS):
+        raise SystemExit(f"YOLO weights not found at {YOLO_WEIGHTS}")
+
+    work_dir = tempfile.mkdtemp(prefix='onnx_parity_')
+    try:
+        pdf_path = args.pdf or write_synthetic_pdf(os.path.join(work_dir, 'synthetic.pdf'), args.pages)
+        sheets = [
+            convert_from_path(pdf_path, dpi=PDF_DPI, first_page=n, last_page=n, thread_count=1)[0]
+            for n in range(1, args.pages + 1)
+        ]
+
+        torch_model = _load_yolo(YOLO_WEIGHTS)
+        onnx_model = OnnxDetector(export_onnx(YOLO_WEIGHTS, quantize=args.quantize))
+        # Warm both up so the timings compare steady-state inference
+        torch_model(sheets[0])
+        onnx_model(sheets[0])
+
+        failed = False
+        timings = {'pytorch': 0.0, 'onnx': 0.0}
+        for page_num, sheet in enumerate(sheets, 1):
+            start = time.perf_counter()
+            reference = _boxes_and_scores(torch_model(sheet)[0])[0]
+            timings['pytorch'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            candidate = onnx_model(sheet)[0][0]
+            timings['onnx'] += time.perf_counter() - start
+
+            pairs, missing, extra = match_boxes(reference, candidate, args.min_iou)
+            shift = max((abs(reference[i] - candidate[j]).max() for i, j in pairs), default=0.0)
+            ok = not missing and not extra and shift <= args.tolerance
+            failed |= not ok
+            print(f"page {page_num}: {len(reference)} pytorch, {len(candidate)} onnx, "
+                  f"{len(missing)} missing, {len(extra)} extra, max shift {shift:.1f}px "
+                  f"{'ok' if ok else 'MISMATCH'}")
+
+        print()
+        for backend, total in timings.items():
+            print(f"{backend:<8} {total / len(sheets):.3f} s/sheet")
+        sys.exit(1 if failed else 0)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import random
+
+POINTS_PER_INCH = 72
+
+def _page_stream(rng, width, height, lines):
+    """Build a content stream of random line work for one page"""
+    ops = ["0.5 w"]
+    # Sheet border and title block, like a typical drawing sheet
+    ops.append(f"20 20 {width - 40:.1f} {height - 40:.1f} re S")
+    ops.append(f"{width - 260:.1f} 20 240 120 re S")
+    for _ in range(lines):
+        x1, y1 = rng.uniform(30, width - 30), rng.uniform(30, height - 30)
+        x2, y2 = rng.uniform(30, width - 30), rng.uniform(30, height - 30)
+        ops.append(f"{x1:.1f} {y1:.1f} m {x2:.1f} {y2:.1f} l S")
+    return "\n".join(ops).encode('ascii')
+
+def write_synthetic_pdf(path, pages, width_in=36, height_in=24, lines_per_page=400, seed=0):
+    """Write a multi-page vector PDF that looks roughly like a drawing set"""
+    rng = random.Random(seed)
+    width = width_in * POINTS_PER_INCH
+    height = height_in * POINTS_PER_INCH
+
+    # Object 1 is the catalog, 2 the page tree, then a page and a content
+    # stream object for every sheet
+    page_ids = [3 + 2 * i for i in range(pages)]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{pid} 0 R" for pid in page_ids), pages)).encode('ascii'),
+    }
+    for pid in page_ids:
+        stream = _page_stream(rng, width, height, lines_per_page)
+        objects[pid] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+            f"/Contents {pid + 1} 0 R >>"
+        ).encode('ascii')
+        objects[pid + 1] = (
+            f"<< /Length {len(stream)} >>\nstream\n".encode('ascii') + stream + b"\nendstream"
+        )
+
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for obj_id in sorted(objects):
+            offsets[obj_id] = f.tell()
+            f.write(f"{obj_id} 0 obj\n".encode('ascii') + objects[obj_id] + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n".encode('ascii'))
+        f.write(b"0000000000 65535 f \n")
+        for obj_id in sorted(objects):
+            f.write(f"{offsets[obj_id]:010d} 00000 n \n".encode('ascii'))
+        f.write(
+            f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii')
+        )
+    return path
@@ -11,6 +11,11 @@ THUMBNAILS_FOLDER = os.path.join(APP_ROOT, 'thumbnails')
 ANNOTATIONS_FOLDER = os.path.join(APP_ROOT, 'annotated_data')
 PROJECTS_FOLDER = os.path.join(APP_ROOT, 'projects')
 USERS_FOLDER = os.path.join(APP_ROOT, 'users')
+# Derived data lives under the uploads volume so it persists with the PDFs
+CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'cache')
+RASTER_CACHE_FOLDER = os.getenv("RASTER_CACHE_FOLDER", os.path.join(CACHE_FOLDER, 'rasters'))
+DETECTION_CACHE_FOLDER = os.getenv("DETECTION_CACHE_FOLDER", os.path.join(CACHE_FOLDER, 'detections'))
+OCR_CACHE_FOLDER = os.getenv("OCR_CACHE_FOLDER", os.path.join(CACHE_FOLDER, 'ocr'))
 
 # Create necessary directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -18,18 +23,77 @@ os.makedirs(THUMBNAILS_FOLDER, exist_ok=True)
 os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
 os.makedirs(PROJECTS_FOLDER, exist_ok=True)
 os.makedirs(USERS_FOLDER, exist_ok=True)
+os.makedirs(RASTER_CACHE_FOLDER, exist_ok=True)
+os.makedirs(DETECTION_CACHE_FOLDER, exist_ok=True)
+os.makedirs(OCR_CACHE_FOLDER, exist_ok=True)
 
 # Azure configuration
 AZURE_ENDPOINT = os.getenv("AZURE_VISION_ENDPOINT", "https://scopebuilder.cognitiveservices.azure.com")
 AZURE_KEY = os.getenv("AZURE_VISION_KEY", "75gzAOgClEIGv8CxaYZcre8X04QxJZGE256MK4y7dMaL1sfLtnHdJQQJ99BEACYeBjFXJ3w3AAAFACOGeQxC")
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "8"))  # Read operations in flight at once across the process
+OCR_HTTP_WORKERS = int(os.getenv("OCR_HTTP_WORKERS", "4"))  # Threads making the short submit and poll requests
+OCR_POLL_INITIAL = float(os.getenv("OCR_POLL_INITIAL", "0.25"))  # Shortest wait in seconds before polling a Read operation
+OCR_POLL_MAX = float(os.getenv("OCR_POLL_MAX", "2.0"))  # Longest wait in seconds between polls
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "120"))  # Give up on a Read operation after this many seconds
+OCR_ENGINE_VERSION = os.getenv("OCR_ENGINE_VERSION", "azure-read-3.2")  # Part of the OCR cache key; change it to stop reusing older results
+OCR_PREFETCH = os.getenv("OCR_PREFETCH", "true").lower() == "true"  # OCR a sheet's crops in the background once it's processed
+OCR_PREFETCH_CONCURRENCY = int(os.getenv("OCR_PREFETCH_CONCURRENCY", "4"))  # Crops sent to the OCR engine at once
 
 # YOLO configuration
 YOLO_WEIGHTS = os.getenv("YOLO_WEIGHTS", os.path.join(APP_ROOT, 'weights', 'best.pt'))
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "ultralytics")  # 'ultralytics' (PyTorch) or 'onnx' (ONNX Runtime on CPU)
+ONNX_WEIGHTS = os.getenv("ONNX_WEIGHTS", "")  # Exported model; defaults to YOLO_WEIGHTS with an .onnx suffix
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "false").lower() == "true"  # Use an int8 dynamically quantized export
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # Intra-op threads per ONNX session (0 lets the runtime decide)
+DETECTION_IMGSZ = int(os.getenv("DETECTION_IMGSZ", "640"))  # ONNX model input size
+DETECTION_CONF = float(os.getenv("DETECTION_CONF", "0.25"))  # Minimum confidence for ONNX detections
+DETECTION_IOU = float(os.getenv("DETECTION_IOU", "0.7"))  # NMS IoU for ONNX detections
+
+# Upload settings
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "1024")) * 1024 * 1024  # Largest PDF accepted
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024  # Chunk size for streaming and resumable uploads
+UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24")) * 3600  # Resumable uploads idle this long are deleted
+# Reject bodies over the limit from their Content-Length, before Werkzeug
+# spools them to disk; the slack covers multipart boundaries and fields
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 1024 * 1024
 
 # PDF processing settings
-PDF_DPI = 100  # Reduced from 150 to lower memory usage
-METADATA_DPI = 72  # Lower DPI just for counting pages
+PDF_DPI = 100  # Resolution of the sheet coordinates stored with boxes and annotations
+DETECTION_DPI = int(os.getenv("DETECTION_DPI", str(PDF_DPI)))  # Full-page render for detection; kept low since it's the whole sheet
+CROP_DPI = int(os.getenv("CROP_DPI", "200"))  # Each figure is rendered from the PDF at this DPI for sharper OCR
+CROP_MAX_SIDE = 10000  # OCR input limit in pixels; larger figures are rendered at a lower DPI
+CROP_RENDER_WORKERS = int(os.getenv("CROP_RENDER_WORKERS", "2"))  # Figures rendered at once per sheet
+METADATA_DPI = 72  # Low DPI for measuring pages when pdfinfo can't report their sizes
 THUMBNAIL_DPI = 72  # Low DPI for thumbnails
+THUMBNAIL_BATCH_PAGES = int(os.getenv("THUMBNAIL_BATCH_PAGES", "1"))  # Pages rasterized at once during ingestion
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "1"))  # Worker processes used to generate thumbnails
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "1"))  # Background ingestion jobs run at once
+SHEETS_CONCURRENCY = int(os.getenv("SHEETS_CONCURRENCY", "1"))  # Batch sheet processing jobs run at once, apart from ingestion
+JOB_STALL_SECONDS = int(os.getenv("JOB_STALL_SECONDS", "120"))  # A job with no progress for this long can be resumed
+THUMBNAIL_WIDTH = int(os.getenv("THUMBNAIL_WIDTH", "600"))  # Target thumbnail width in pixels (0 keeps THUMBNAIL_DPI size)
+THUMBNAIL_FORMATS = [f.strip().lower() for f in os.getenv("THUMBNAIL_FORMATS", "webp").split(",") if f.strip()]  # Preferred encodings, PNG is always kept as fallback
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "75"))  # Quality for WebP/JPEG thumbnails
+THUMBNAIL_MAX_BYTES = int(os.getenv("THUMBNAIL_MAX_BYTES", "0"))  # Lower lossy quality until under this size (0 disables)
+ATLAS_CELL_WIDTH = int(os.getenv("ATLAS_CELL_WIDTH", "220"))  # Width of each page in the sheet selector sprite atlas
+ATLAS_PAGES_PER_SHEET = int(os.getenv("ATLAS_PAGES_PER_SHEET", "60"))  # Pages packed into one atlas image
+ATLAS_COLUMNS = 10  # Pages per atlas row
+CROP_STORAGE = os.getenv("CROP_STORAGE", "files")  # 'files' saves crop PNGs, 'virtual' keeps only boxes and cuts crops on demand
+RASTER_CACHE_MB = int(os.getenv("RASTER_CACHE_MB", "2048"))  # Disk budget for cached full-sheet rasters (0 disables)
+LAZY_THUMBNAILS = os.getenv("LAZY_THUMBNAILS", "false").lower() == "true"  # Render thumbnails only when first viewed
+
+# Sheet detection settings
+DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", "4"))  # Pages per YOLO forward pass in batch mode
+PRELOAD_DETECTOR = os.getenv("PRELOAD_DETECTOR", "false").lower() == "true"  # Load and warm up YOLO at startup
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))  # Preloaded detector workers, each with its own model
+DETECTION_MODE = os.getenv("DETECTION_MODE", "full")  # 'full' page or overlapping 'tiled' inference; projects can override
+TILE_DPI = int(os.getenv("TILE_DPI", "200"))  # Render DPI for tiled detection
+TILE_SIZE = int(os.getenv("TILE_SIZE", "1280"))  # Tile edge in pixels at TILE_DPI
+TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", "256"))  # Pixels shared by neighbouring tiles
+TILE_NMS_IOU = float(os.getenv("TILE_NMS_IOU", "0.5"))  # IoU above which boxes from different tiles are duplicates
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))  # Rendered/detected pages buffered between pipeline stages
+PIPELINE_ENCODE_WORKERS = int(os.getenv("PIPELINE_ENCODE_WORKERS", "2"))  # Threads writing crops while detection continues
+PIPELINE_BATCH_WAIT = float(os.getenv("PIPELINE_BATCH_WAIT", "0.5"))  # Seconds detection waits for a full batch of rendered pages
+DETECTION_CACHE = os.getenv("DETECTION_CACHE", "true").lower() == "true"  # Reuse boxes found for the same PDF page, settings and weights
 
 # Scopes list
 SCOPES = [
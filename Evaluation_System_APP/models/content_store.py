@@ -0,0 +1,72 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from Evaluation_System_APP.config import UPLOAD_FOLDER
+
+HASH_CHUNK_SIZE = 1024 * 1024
+CONTENT_INDEX_PATH = os.path.join(UPLOAD_FOLDER, 'content_index.json')
+
+_index_lock = threading.Lock()
+
+def hash_file(path):
+    """Compute the SHA-256 of a file without reading it all into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _load_index():
+    if not os.path.exists(CONTENT_INDEX_PATH):
+        return {}
+    with open(CONTENT_INDEX_PATH) as f:
+        return json.load(f)
+
+def _save_index(index):
+    tmp_path = f"{CONTENT_INDEX_PATH}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, CONTENT_INDEX_PATH)
+
+def find_upload_by_hash(content_hash):
+    """Find an existing upload with the same PDF bytes"""
+    with _index_lock:
+        upload_ids = _load_index().get(content_hash, [])
+
+    for upload_id in upload_ids:
+        pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
+        meta_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}_metadata.json")
+        if os.path.exists(pdf_path) and os.path.exists(meta_path):
+            return upload_id
+    return None
+
+def register_upload_hash(content_hash, upload_id):
+    """Record that an upload holds the PDF with this content hash"""
+    with _index_lock:
+        index = _load_index()
+        upload_ids = index.setdefault(content_hash, [])
+        if upload_id not in upload_ids:
+            upload_ids.append(upload_id)
+        _save_index(index)
+
+def unregister_upload(upload_id):
+    """Drop an upload from the content index when it is deleted"""
+    with _index_lock:
+        index = _load_index()
+        for content_hash in list(index):
+            if upload_id in index[content_hash]:
+                index[content_hash].remove(upload_id)
+            if not index[content_hash]:
+                del index[content_hash]
+        _save_index(index)
+
+def link_or_copy(src, dst):
+    """Hard-link a derived file into another upload, copying across devices"""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
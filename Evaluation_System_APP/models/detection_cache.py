@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from Evaluation_System_APP.config import (
+    DETECTION_CACHE_FOLDER, PDF_DPI, DETECTOR_BACKEND,
+    DETECTION_IMGSZ, DETECTION_CONF, DETECTION_IOU
+)
+from Evaluation_System_APP.models.content_store import hash_file
+
+# Hashes of files already read, keyed by (path, mtime, size)
+_file_hashes = {}
+_hash_lock = threading.Lock()
+
+def file_hash(path):
+    """SHA-256 of a file, recomputed only when the file changes"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    with _hash_lock:
+        if key in _file_hashes:
+            return _file_hashes[key]
+    digest = hash_file(path)
+    with _hash_lock:
+        _file_hashes[key] = digest
+    return digest
+
+def detection_key(weights_path, dpi, settings):
+    """Everything besides the page itself that changes which boxes are found
+
+    The weights are identified by content rather than path, so deploying new
+    weights under the same file name still misses the old entries.
+    """
+    key = {
+        'weights': file_hash(weights_path),
+        'backend': DETECTOR_BACKEND,
+        'dpi': dpi,
+        'sheet_dpi': PDF_DPI,
+        'imgsz': DETECTION_IMGSZ,
+        'conf': DETECTION_CONF,
+        'iou': DETECTION_IOU,
+        'mode': settings['mode']
+    }
+    if settings['mode'] == 'tiled':
+        key.update({name: settings[name] for name in ('tile_size', 'tile_overlap', 'tile_nms_iou')})
+    return key
+
+class DetectionCache:
+    """Boxes found on the pages of one PDF under one detection key"""
+
+    def __init__(self, pdf_hash, key):
+        self.pdf_hash = pdf_hash
+        self.key = key
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+        self._prefix = os.path.join(DETECTION_CACHE_FOLDER, pdf_hash[:2], f"{pdf_hash}_{digest}")
+
+    def _path(self, page_num):
+        return f"{self._prefix}_page{page_num}.json"
+
+    def get(self, page_num):
+        """Sheet boxes found earlier for this page, or None"""
+        try:
+            with open(self._path(page_num)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Guards against a digest collision
+        if entry.get('key') != self.key:
+            return None
+        return np.array(entry['boxes'], dtype=int).reshape(-1, 4)
+
+    def put(self, page_num, boxes):
+        """Remember the boxes found on a page"""
+        path = self._path(page_num)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entry = {
+            'key': self.key,
+            'boxes': np.asarray(boxes, dtype=int).reshape(-1, 4).tolist(),
+            'created_at': time.time()
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error caching detections for page {page_num}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,77 @@
+import io
+import os
+import threading
+from Evaluation_System_APP.config import (
+    THUMBNAIL_FORMATS, THUMBNAIL_QUALITY, THUMBNAIL_MAX_BYTES
+)
+
+# File extension and Pillow format name for each supported encoding
+IMAGE_FORMATS = {
+    'webp': ('webp', 'WEBP'),
+    'jpeg': ('jpg', 'JPEG'),
+    'png': ('png', 'PNG'),
+}
+
+# Lowest quality the size-targeting loop will go down to
+MIN_QUALITY = 30
+
+def write_atomic(path, data):
+    """Write bytes to a temp file and move it into place"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def encode_image(img, fmt, quality=THUMBNAIL_QUALITY, max_bytes=THUMBNAIL_MAX_BYTES):
+    """Encode an image to bytes in one of IMAGE_FORMATS"""
+    pil_format = IMAGE_FORMATS[fmt][1]
+    if fmt == 'png':
+        # Line drawings survive palette reduction with no visible change and
+        # compress several times smaller
+        buf = io.BytesIO()
+        img.convert('RGB').quantize(colors=256).save(buf, pil_format, optimize=True)
+        return buf.getvalue()
+
+    # Lossy formats step the quality down until the size target is met
+    rgb = img.convert('RGB')
+    while True:
+        buf = io.BytesIO()
+        rgb.save(buf, pil_format, quality=quality, optimize=True)
+        if not max_bytes or buf.tell() <= max_bytes or quality <= MIN_QUALITY:
+            return buf.getvalue()
+        quality = max(MIN_QUALITY, quality - 10)
+
+def save_image_variants(img, base_path, formats=THUMBNAIL_FORMATS):
+    """Save an image in each configured format plus the PNG fallback
+
+    The PNG is written last, so once it exists every other variant does
+    too.
+    """
+    for fmt in [f for f in formats if f != 'png'] + ['png']:
+        ext = IMAGE_FORMATS[fmt][0]
+        write_atomic(f"{base_path}.{ext}", encode_image(img, fmt))
+    return f"{os.path.basename(base_path)}.png"
+
+def variant_paths(base_path):
+    """All encoded variants of an image that exist on disk"""
+    paths = []
+    for ext, _ in IMAGE_FORMATS.values():
+        path = f"{base_path}.{ext}"
+        if os.path.exists(path):
+            paths.append(path)
+    return paths
+
+def negotiate_variant(directory, filename, accept_header):
+    """Pick the best stored variant of a PNG the client accepts"""
+    base, ext = os.path.splitext(filename)
+    if ext != '.png':
+        return filename
+
+    for fmt in THUMBNAIL_FORMATS:
+        # WebP must be listed explicitly; a bare */* doesn't mean support
+        if fmt == 'webp' and 'image/webp' not in accept_header:
+            continue
+        candidate = f"{base}.{IMAGE_FORMATS[fmt][0]}"
+        if os.path.exists(os.path.join(directory, candidate)):
+            return candidate
+    return filename
@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from Evaluation_System_APP.config import YOLO_WEIGHTS, INFERENCE_WORKERS
+from Evaluation_System_APP.models.model_registry import has_model
+
+# Size of the blank image used for the warm-up inference
+WARMUP_SIZE = (640, 640)
+# Seconds before retrying a failed load, doubling up to the maximum
+RETRY_DELAY = 5
+MAX_RETRY_DELAY = 300
+
+class InferencePool:
+    """Dedicated detector workers, each with its own warmed-up model
+
+    Every worker loads its own copy of the weights and runs one inference
+    on a blank image before reporting ready, so the first real request
+    never pays for imports, weight loading or lazy model setup. A worker
+    whose load fails keeps retrying with backoff; the pool takes requests
+    as soon as any one worker is ready.
+    """
+
+    def __init__(self, workers, loader, weights_path=YOLO_WEIGHTS):
+        self.workers = workers
+        self.loader = loader
+        self.weights_path = weights_path
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._ready_workers = 0
+        # Last load error of each worker that hasn't come up yet
+        self._errors = {}
+
+    def start(self):
+        for i in range(self.workers):
+            threading.Thread(
+                target=self._worker, args=(i,), name=f'inference-{i}', daemon=True
+            ).start()
+
+    @property
+    def ready(self):
+        with self._lock:
+            return self._ready_workers > 0
+
+    @property
+    def failed(self):
+        with self._lock:
+            return bool(self._errors)
+
+    def status(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'ready_workers': self._ready_workers,
+                'errors': list(self._errors.values())
+            }
+
+    def _load(self):
+        from PIL import Image
+        mtime = os.path.getmtime(self.weights_path)
+        model = self.loader(self.weights_path)
+        model(Image.new('RGB', WARMUP_SIZE, 'white'))
+        return mtime, model
+
+    def _load_with_retry(self, index):
+        delay = RETRY_DELAY
+        while True:
+            try:
+                return self._load()
+            except Exception as e:
+                print(f"Error preloading detector, retrying in {delay}s: {e}")
+                with self._lock:
+                    self._errors[index] = str(e)
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _worker(self, index):
+        mtime, model = self._load_with_retry(index)
+        with self._lock:
+            self._errors.pop(index, None)
+            self._ready_workers += 1
+
+        while True:
+            images, future = self._requests.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                # Pick up newly deployed weights between requests
+                if os.path.getmtime(self.weights_path) != mtime:
+                    mtime, model = self._load()
+                future.set_result(model(images))
+            except Exception as e:
+                future.set_exception(e)
+
+    def run(self, images):
+        """Run detection on the next free worker and wait for the results"""
+        future = Future()
+        self._requests.put((images, future))
+        return future.result()
+
+_pool = None
+
+def start_inference_pool(loader, workers=None, weights_path=YOLO_WEIGHTS):
+    """Start the preloaded detector workers in the background"""
+    global _pool
+    if _pool is None:
+        _pool = InferencePool(workers or INFERENCE_WORKERS, loader, weights_path)
+        _pool.start()
+    return _pool
+
+def get_inference_pool():
+    """The running pool, if at least one worker is ready to take requests"""
+    if _pool is not None and _pool.ready:
+        return _pool
+    return None
+
+def inference_status():
+    """Readiness report for health checks"""
+    if _pool is None:
+        return {'preloaded': False, 'ready': True}
+    status = _pool.status()
+    # Until a worker comes up, requests load the model on demand instead;
+    # once that fallback has loaded, the process can serve detection
+    ready = _pool.ready or has_model(_pool.weights_path)
+    status.update({'preloaded': True, 'ready': ready})
+    return status
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import fcntl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from Evaluation_System_APP.config import (
+    UPLOAD_FOLDER, INGEST_CONCURRENCY, SHEETS_CONCURRENCY, JOB_STALL_SECONDS
+)
+from Evaluation_System_APP.models.sheet_lock import LOCKS_FOLDER
+
+# Background jobs run on small bounded pools so a burst of uploads can't
+# take every server thread away from interactive requests. Batch sheet
+# processing has a pool of its own, so a long run doesn't hold up the
+# thumbnails of new uploads.
+_executors = {
+    'ingest': ThreadPoolExecutor(max_workers=INGEST_CONCURRENCY, thread_name_prefix='job'),
+    'sheets': ThreadPoolExecutor(max_workers=SHEETS_CONCURRENCY, thread_name_prefix='sheets-job')
+}
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+# Minimum seconds between progress writes while a job is running
+PROGRESS_SAVE_INTERVAL = 1.0
+# Status checks hold a job's lock for an instant; a run waits this long
+# for it before deciding another process has the job
+JOB_LOCK_WAIT = 1.0
+JOB_LOCK_POLL = 0.05
+
+def _job_path(upload_id, kind):
+    return os.path.join(UPLOAD_FOLDER, f"{upload_id}_{kind}_job.json")
+
+def _job_lock_path(upload_id, kind):
+    return os.path.join(LOCKS_FOLDER, f"{upload_id}_{kind}_job.lock")
+
+def _try_lock(f):
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+def _wait_lock(f, timeout=JOB_LOCK_WAIT):
+    """Take the lock, riding out brief holds by is_job_running_elsewhere"""
+    deadline = time.monotonic() + timeout
+    while not _try_lock(f):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(JOB_LOCK_POLL)
+    return True
+
+def get_job_status(upload_id, kind):
+    """Load the persisted state of a background job"""
+    job_path = _job_path(upload_id, kind)
+    if not os.path.exists(job_path):
+        return None
+
+    with open(job_path) as f:
+        return json.load(f)
+
+def save_job_status(job):
+    """Persist job state atomically so pollers never read a partial file"""
+    job_path = _job_path(job['upload_id'], job['kind'])
+    tmp_path = f"{job_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f, indent=2)
+    os.replace(tmp_path, job_path)
+
+class JobProgress:
+    """Thread-safe progress tracker for a job that works through pages"""
+
+    def __init__(self, job):
+        self.job = job
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._last_save = 0.0
+
+    def page_done(self, page_num):
+        """Record a finished page and periodically persist the state"""
+        with self._lock:
+            if page_num not in self.job['completed_pages']:
+                self.job['completed_pages'].append(page_num)
+            self.job['pages_done'] = len(self.job['completed_pages'])
+            self._update_eta()
+            if time.time() - self._last_save >= PROGRESS_SAVE_INTERVAL:
+                self.save()
+
+    def skip_pages(self, page_nums):
+        """Record pages an earlier run already finished"""
+        with self._lock:
+            completed = set(self.job['completed_pages'])
+            completed.update(page_nums)
+            self.job['completed_pages'] = sorted(completed)
+            self.job['pages_done'] = len(completed)
+            # They don't count towards this run's rate
+            self.job['pages_done_at_start'] = self.job['pages_done']
+            self.save()
+
+    def error(self, message):
+        """Record an error without stopping the job"""
+        with self._lock:
+            self.job['errors'].append(message)
+            self.save()
+
+    def set_stats(self, name, stats):
+        """Attach stats to the job; they're persisted with the next save"""
+        with self._lock:
+            self.job[name] = stats
+
+    def _update_eta(self):
+        # Only pages finished in this run count towards the rate
+        done_now = self.job['pages_done'] - self.job.get('pages_done_at_start', 0)
+        remaining = self.job['total_pages'] - self.job['pages_done']
+        if done_now > 0:
+            rate = (time.time() - self._started) / done_now
+            self.job['eta_seconds'] = round(rate * remaining, 1)
+
+    def save(self):
+        self.job['updated_at'] = time.time()
+        save_job_status(self.job)
+        self._last_save = time.time()
+
+    def finish(self, state):
+        with self._lock:
+            self.job['state'] = state
+            self.job['eta_seconds'] = 0 if state == 'done' else None
+            self.job['finished_at'] = time.time()
+            self.save()
+
+def _run_job(job, target, args):
+    """Run a job unless another worker process is already running it
+
+    Each run holds an flock for the job, which the OS drops if the process
+    dies, so a job queued by several processes at once still runs once.
+    """
+    key = (job['upload_id'], job['kind'])
+    try:
+        os.makedirs(LOCKS_FOLDER, exist_ok=True)
+        with open(_job_lock_path(*key), 'a') as lock_file:
+            if not _wait_lock(lock_file):
+                print(f"Skipping {job['kind']} job for {job['upload_id']}: another process is running it")
+                return
+            # Another process may have finished it while this run was queued
+            persisted = get_job_status(*key)
+            if persisted and persisted['state'] not in ('queued', 'running'):
+                return
+            _run_locked(job, target, args)
+    finally:
+        with _active_lock:
+            _active_jobs.discard(key)
+
+def _run_locked(job, target, args):
+    progress = JobProgress(job)
+    try:
+        job['state'] = 'running'
+        job['started_at'] = time.time()
+        job['pages_done_at_start'] = job['pages_done']
+        progress.save()
+        target(*args, progress=progress)
+        progress.finish('done' if not job['errors'] else 'done_with_errors')
+    except Exception as e:
+        print(f"Error running {job['kind']} job for {job['upload_id']}: {e}")
+        job['errors'].append(str(e))
+        progress.finish('failed')
+
+def submit_job(upload_id, kind, total_pages, target, *args, resume=False, details=None):
+    """Queue a background job; target is called with a `progress` keyword
+
+    With `resume`, the pages recorded by a previous run of the job are
+    kept and its errors are cleared for the retry. `details` are saved
+    with a new job, e.g. what a later resume needs to know.
+    """
+    key = (upload_id, kind)
+    with _active_lock:
+        if key in _active_jobs:
+            return get_job_status(upload_id, kind)
+        _active_jobs.add(key)
+
+    previous = get_job_status(upload_id, kind) if resume else None
+    if previous:
+        job = previous
+        job.update({
+            'state': 'queued',
+            'errors': [],
+            'eta_seconds': None,
+            'resumes': job.get('resumes', 0) + 1,
+            'queued_at': time.time()
+        })
+        save_job_status(job)
+        _executors.get(kind, _executors['ingest']).submit(_run_job, job, target, args)
+        return job
+
+    job = {
+        'upload_id': upload_id,
+        'kind': kind,
+        'state': 'queued',
+        'total_pages': total_pages,
+        'pages_done': 0,
+        'completed_pages': [],
+        'errors': [],
+        'eta_seconds': None,
+        'queued_at': time.time()
+    }
+    job.update(details or {})
+    save_job_status(job)
+    _executors.get(kind, _executors['ingest']).submit(_run_job, job, target, args)
+    return job
+
+def fail_job(upload_id, kind, message):
+    """Mark a job that can't be resumed as failed"""
+    job = get_job_status(upload_id, kind)
+    if not job:
+        return
+    job['state'] = 'failed'
+    job['errors'].append(message)
+    job['eta_seconds'] = None
+    job['finished_at'] = time.time()
+    job['updated_at'] = time.time()
+    save_job_status(job)
+
+def is_job_active(upload_id, kind):
+    """Check whether a job is queued or running in this process"""
+    with _active_lock:
+        return (upload_id, kind) in _active_jobs
+
+def is_job_running_elsewhere(upload_id, kind):
+    """Check whether any process, this one included, is running a job right now
+
+    The check takes the job's lock for an instant; a run starting at that
+    moment waits for it rather than giving up.
+    """
+    path = _job_lock_path(upload_id, kind)
+    if not os.path.exists(path):
+        return False
+    with open(path, 'a') as lock_file:
+        return not _try_lock(lock_file)
+
+def is_job_stalled(job):
+    """A queued or running job nobody has touched for a while was interrupted"""
+    if job['state'] not in ('queued', 'running'):
+        return False
+    if is_job_active(job['upload_id'], job['kind']):
+        return False
+    if is_job_running_elsewhere(job['upload_id'], job['kind']):
+        return False
+    last_seen = job.get('updated_at') or job.get('queued_at') or 0
+    return time.time() - last_seen > JOB_STALL_SECONDS
@@ -0,0 +1,43 @@
+import os
+import threading
+
+# Loaded models keyed by absolute weights path: (mtime, model, inference lock)
+_models = {}
+_registry_lock = threading.Lock()
+
+def get_model(weights_path, loader):
+    """Load a weights file once per process and reuse it
+
+    The model is reloaded when the file's modification time changes, e.g.
+    after new weights are deployed. Concurrent callers wait on a single
+    load instead of each loading their own copy.
+    """
+    path = os.path.abspath(weights_path)
+    mtime = os.path.getmtime(path)
+    with _registry_lock:
+        cached = _models.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        model = loader(path)
+        _models[path] = (mtime, model, threading.Lock())
+        return model
+
+def has_model(weights_path):
+    """Whether a weights file has already been loaded in this process"""
+    with _registry_lock:
+        return os.path.abspath(weights_path) in _models
+
+def model_lock(model):
+    """Lock that serializes inference on a shared model instance"""
+    with _registry_lock:
+        for _, cached_model, lock in _models.values():
+            if cached_model is model:
+                return lock
+    # Models loaded outside the registry aren't shared
+    return threading.Lock()
+
+def clear_models():
+    """Drop every cached model"""
+    with _registry_lock:
+        _models.clear()
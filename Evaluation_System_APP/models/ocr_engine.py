@@ -0,0 +1,133 @@
+import io
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from Evaluation_System_APP.config import (
+    OCR_MAX_CONCURRENCY, OCR_HTTP_WORKERS, OCR_POLL_INITIAL, OCR_POLL_MAX, OCR_TIMEOUT
+)
+
+# Growth of the wait between polls of an operation that isn't done yet
+POLL_BACKOFF = 1.5
+
+# Weight of the latest operation in the running average of OCR time
+DURATION_SMOOTHING = 0.2
+
+def get_cv_client():
+    from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+    from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
+    from msrest.authentication import CognitiveServicesCredentials
+    from Evaluation_System_APP.config import AZURE_ENDPOINT, AZURE_KEY
+    return ComputerVisionClient(
+        AZURE_ENDPOINT,
+        CognitiveServicesCredentials(AZURE_KEY)
+    ), OperationStatusCodes
+
+class OcrError(Exception):
+    """A Read operation failed or didn't finish in time"""
+
+class OcrEngine:
+    """Azure Read operations driven by one asyncio loop in a background thread
+
+    Waiting for Azure holds no thread: operations sleep on the loop between
+    polls, and only the short submit and poll requests run on a small pool
+    of HTTP threads, since the SDK is synchronous. At most
+    `max_concurrency` operations are in flight across the process.
+
+    Polling adapts to how long OCR has been taking: the first poll comes
+    shortly before a typical operation would finish, and the wait grows
+    while it is still running.
+    """
+
+    def __init__(self, client_factory=get_cv_client, max_concurrency=OCR_MAX_CONCURRENCY,
+                 http_workers=OCR_HTTP_WORKERS):
+        self._client_factory = client_factory
+        self._client = None
+        self._max_concurrency = max_concurrency
+        self._typical_seconds = None
+        self.in_flight = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(http_workers, thread_name_prefix='ocr-http'))
+        self._thread = threading.Thread(target=self._run_loop, name='ocr-engine', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        # Coroutines only run inside run_forever, after this exists
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._loop.run_forever()
+
+    async def _call(self, fn, *args, **kwargs):
+        return await self._loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    def _first_poll_delay(self):
+        if self._typical_seconds is None:
+            return OCR_POLL_INITIAL
+        return min(max(OCR_POLL_INITIAL, self._typical_seconds * 0.8), OCR_POLL_MAX)
+
+    def _record_duration(self, seconds):
+        if self._typical_seconds is None:
+            self._typical_seconds = seconds
+        else:
+            self._typical_seconds += DURATION_SMOOTHING * (seconds - self._typical_seconds)
+
+    async def read_async(self, image_bytes):
+        """OCR an image, returning its lines as {'text', 'bounding_box'} dicts
+
+        Bounding boxes are the flat [x1, y1, ..., x4, y4] quads Azure
+        returns, in the image's pixels.
+        """
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await self._read(image_bytes)
+            finally:
+                self.in_flight -= 1
+
+    async def _read(self, image_bytes):
+        if self._client is None:
+            self._client = self._client_factory()
+        client, status_codes = self._client
+
+        started = self._loop.time()
+        resp = await self._call(client.read_in_stream, io.BytesIO(image_bytes), raw=True)
+        op_id = resp.headers['Operation-Location'].split('/')[-1]
+
+        delay = self._first_poll_delay()
+        while True:
+            await asyncio.sleep(delay)
+            result = await self._call(client.get_read_result, op_id)
+            if result.status not in ('notStarted', 'running'):
+                break
+            if self._loop.time() - started > OCR_TIMEOUT:
+                raise OcrError(f"Read operation {op_id} timed out")
+            delay = min(delay * POLL_BACKOFF, OCR_POLL_MAX)
+
+        if result.status != status_codes.succeeded:
+            raise OcrError(f"Read operation {op_id} {result.status}")
+        self._record_duration(self._loop.time() - started)
+
+        return [
+            {'text': line.text, 'bounding_box': list(line.bounding_box)}
+            for page in result.analyze_result.read_results
+            for line in page.lines
+        ]
+
+    def submit(self, image_bytes):
+        """Start OCR from any thread; returns a concurrent.futures.Future of the lines"""
+        return asyncio.run_coroutine_threadsafe(self.read_async(image_bytes), self._loop)
+
+    def read(self, image_bytes, timeout=None):
+        """OCR an image and wait for the lines; operations time out on their own"""
+        return self.submit(image_bytes).result(timeout)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_ocr_engine():
+    """The process-wide OCR engine, started on first use"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OcrEngine()
+        return _engine
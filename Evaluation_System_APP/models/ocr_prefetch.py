@@ -0,0 +1,175 @@
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from Evaluation_System_APP.config import OCR_PREFETCH_CONCURRENCY
+from Evaluation_System_APP.models.ocr_engine import get_ocr_engine
+from Evaluation_System_APP.models.ocr_store import load_ocr_lines, save_ocr_lines, record_ocr_miss
+
+# Lower numbers are read first
+PRIORITY_VIEWING = 0
+PRIORITY_NEXT = 1
+PRIORITY_PREFETCH = 2
+
+class OcrPrefetcher:
+    """Priority queue of crops waiting for OCR
+
+    A crop is read at most once at a time: requesting one that's already
+    queued or running returns the same future, and requesting it with a
+    better priority moves it up the queue. At most `concurrency` crops are
+    with the OCR engine at once, so queued prefetches can't hold back the
+    crop an annotator has open. The OCR cache is checked before calling the
+    engine and filled afterwards; a miss is counted once per crop however
+    many callers wait on it. Results are saved to the cache on a small
+    worker pool rather than the OCR engine's event loop, whose done-callbacks
+    would otherwise stall every in-flight poll behind the file writes.
+
+    `get_crop(upload_id, page_num, crop_idx)` returns the crop's entry from
+    crops.json and its crop pixels per sheet unit, and `get_image(...)` its
+    PNG bytes.
+    """
+
+    def __init__(self, get_crop, get_image, concurrency=OCR_PREFETCH_CONCURRENCY):
+        self._get_crop = get_crop
+        self._get_image = get_image
+        self._heap = []
+        self._order = itertools.count()
+        # Key -> [priority, future, started, image bytes already missed in the
+        # cache, miss counted]
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(concurrency)
+        self._savers = ThreadPoolExecutor(concurrency, thread_name_prefix='ocr-save')
+        self._thread = threading.Thread(target=self._dispatch, name='ocr-prefetch', daemon=True)
+        self._thread.start()
+
+    def request(self, upload_id, page_num, crop_idx, priority=PRIORITY_PREFETCH, image_bytes=None):
+        """Queue OCR for a crop; returns a future of its lines
+
+        Callers that already missed the cache with the crop's `image_bytes`
+        pass them, so they aren't rendered again. The cache is checked again
+        with them first, in case a prefetch of the same crop saved its lines
+        since; otherwise their miss is counted here, unless another caller's
+        miss on the same crop already was.
+        """
+        key = (upload_id, page_num, crop_idx)
+        lines, count_miss = None, False
+        with self._cond:
+            entry = self._pending.get(key)
+            if image_bytes is not None and (entry is None or not entry[2]):
+                # A read of the same bytes may have been saved since the
+                # caller missed the cache; checked under the lock so the crop
+                # can't be queued again in between
+                lines = load_ocr_lines(image_bytes, count_miss=False)
+
+            if lines is not None:
+                future = entry[1] if entry is not None else Future()
+                # A queued entry's heap entry is skipped once it's gone
+                self._pending.pop(key, None)
+            else:
+                new = entry is None
+                if new:
+                    entry = self._pending[key] = [priority, Future(), False, image_bytes, False]
+                elif not entry[2] and image_bytes is not None:
+                    entry[3] = image_bytes
+                count_miss = image_bytes is not None and not entry[4]
+                if count_miss:
+                    entry[4] = True
+
+                if new or (not entry[2] and priority < entry[0]):
+                    # A bumped entry's old heap entry is skipped when it comes up
+                    entry[0] = priority
+                    heapq.heappush(self._heap, (priority, next(self._order), key))
+                    self._cond.notify()
+                future = entry[1]
+
+        if lines is not None:
+            future.set_result(lines)
+        elif count_miss:
+            record_ocr_miss()
+        return future
+
+    def queued(self):
+        """Crops waiting for a slot"""
+        with self._cond:
+            return sum(1 for entry in self._pending.values() if not entry[2])
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while not self._heap:
+                    self._cond.wait()
+                priority, _, key = heapq.heappop(self._heap)
+                entry = self._pending.get(key)
+                if entry is None or entry[2] or entry[0] != priority:
+                    continue
+                entry[2] = True
+                return key, entry[1], entry[3]
+
+    def _missed(self, key):
+        """Count the dispatcher's own cache miss unless a caller already did"""
+        with self._cond:
+            entry = self._pending.get(key)
+            count_miss = entry is not None and not entry[4]
+            if count_miss:
+                entry[4] = True
+        if count_miss:
+            record_ocr_miss()
+
+    def _finish(self, key, future, lines=None, error=None):
+        with self._cond:
+            self._pending.pop(key, None)
+        self._slots.release()
+        if error is not None:
+            print(f"Error running OCR for crop {key}: {error}")
+            future.set_exception(error)
+        else:
+            future.set_result(lines)
+
+    def _dispatch(self):
+        while True:
+            # Pick the best crop only once a slot is free, so late bumps count
+            self._slots.acquire()
+            key, future, image_bytes = self._next()
+            try:
+                crop = self._get_crop(*key)
+                if crop is None:
+                    raise ValueError('Unknown crop')
+                if image_bytes is None:
+                    image_bytes = self._get_image(*key)
+                    lines = load_ocr_lines(image_bytes, count_miss=False)
+                    if lines is not None:
+                        self._finish(key, future, lines)
+                        continue
+                    self._missed(key)
+                started = time.perf_counter()
+                ocr = get_ocr_engine().submit(image_bytes)
+            except Exception as e:
+                self._finish(key, future, error=e)
+                continue
+            ocr.add_done_callback(
+                lambda ocr, key=key, future=future, image_bytes=image_bytes, crop=crop, started=started:
+                    self._hand_off(key, future, image_bytes, crop, time.perf_counter() - started, ocr)
+            )
+
+    def _hand_off(self, key, future, image_bytes, crop, seconds, ocr):
+        # Runs on the engine's event loop: keep the cache write off it
+        try:
+            self._savers.submit(self._ocr_done, key, future, image_bytes, crop, seconds, ocr)
+        except Exception as e:
+            self._finish(key, future, error=e)
+
+    def _ocr_done(self, key, future, image_bytes, crop, seconds, ocr):
+        lines, error = None, None
+        try:
+            error = ocr.exception()
+            if error is None:
+                lines = ocr.result()
+                crop_box, crop_scale = crop
+                save_ocr_lines(image_bytes, lines, crop_box, crop_scale, ocr_seconds=seconds)
+        except Exception as e:
+            error = e
+        finally:
+            # Always hand back the slot and settle the future
+            self._finish(key, future, lines, error)
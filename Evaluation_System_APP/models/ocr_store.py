@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import threading
+from Evaluation_System_APP.config import OCR_CACHE_FOLDER, OCR_ENGINE_VERSION
+
+STATS_PATH = os.path.join(OCR_CACHE_FOLDER, 'stats.json')
+
+def image_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+def _entry_path(digest, engine_version):
+    return os.path.join(OCR_CACHE_FOLDER, digest[:2], f"{digest}_{engine_version}.json")
+
+def _count(hit, saved_seconds=0.0):
+    """Add a lookup to the counters shared by every worker process"""
+    try:
+        with open(STATS_PATH, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                stats = json.loads(f.read() or '{}')
+            except ValueError:
+                stats = {}
+            key = 'hits' if hit else 'misses'
+            stats[key] = stats.get(key, 0) + 1
+            stats['saved_seconds'] = round(stats.get('saved_seconds', 0.0) + saved_seconds, 3)
+            f.seek(0)
+            f.truncate()
+            json.dump(stats, f)
+    except OSError as e:
+        print(f"Error updating OCR cache stats: {e}")
+
+def ocr_cache_stats():
+    """Lookup counts since the cache was created
+
+    Every hit is an Azure Read call not paid for; `saved_seconds` adds up
+    how long those calls took when they were first made.
+    """
+    try:
+        with open(STATS_PATH) as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        stats = {}
+    hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+    return {
+        'engine_version': OCR_ENGINE_VERSION,
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        'saved_seconds': stats.get('saved_seconds', 0.0)
+    }
+
+def load_ocr_lines(image_bytes, engine_version=OCR_ENGINE_VERSION, count_miss=True):
+    """OCR lines read earlier from identical image bytes, or None
+
+    Keyed by content rather than by upload and crop, so re-uploaded sets,
+    re-detected sheets with unchanged figures and crops that were opened
+    but never annotated all reuse the first result. With count_miss=False
+    the caller counts a miss itself through record_ocr_miss.
+    """
+    try:
+        with open(_entry_path(image_hash(image_bytes), engine_version)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        if count_miss:
+            _count(hit=False)
+        return None
+    _count(hit=True, saved_seconds=entry.get('ocr_seconds', 0.0))
+    return entry['lines']
+
+def record_ocr_miss():
+    """Count a cache miss looked up with count_miss=False"""
+    _count(hit=False)
+
+def save_ocr_lines(image_bytes, lines, crop_box=None, crop_scale=1.0, ocr_seconds=0.0,
+                   engine_version=OCR_ENGINE_VERSION):
+    """Store the raw OCR lines of an image
+
+    Lines keep Azure's crop-pixel bounding boxes. When the crop's box is
+    given, the sheet-relative points of where it was first read are kept
+    alongside them.
+    """
+    digest = image_hash(image_bytes)
+    stored_lines = []
+    for line in lines:
+        stored = dict(line)
+        if crop_box:
+            bb = line['bounding_box']
+            stored['sheet_pts'] = [
+                [x / crop_scale + crop_box['x1'], y / crop_scale + crop_box['y1']]
+                for x, y in zip(bb[0::2], bb[1::2])
+            ]
+        stored_lines.append(stored)
+
+    entry = {
+        'image_sha256': digest,
+        'engine_version': engine_version,
+        'lines': stored_lines,
+        'crop_box': crop_box,
+        'ocr_seconds': round(ocr_seconds, 3),
+        'created_at': time.time()
+    }
+    path = _entry_path(digest, engine_version)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error caching OCR result: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,200 @@
+import os
+import argparse
+import threading
+import numpy as np
+from PIL import Image
+from Evaluation_System_APP.config import (
+    YOLO_WEIGHTS, ONNX_WEIGHTS, ONNX_QUANTIZE, ONNX_THREADS,
+    DETECTION_IMGSZ, DETECTION_CONF, DETECTION_IOU
+)
+from Evaluation_System_APP.models.tiling import nms
+
+# Padding colour ultralytics uses when letterboxing
+LETTERBOX_FILL = (114, 114, 114)
+# Largest YOLOv8 stride; rectangular inputs are padded to a multiple of it
+MODEL_STRIDE = 32
+
+# Same caps as ultralytics' default NMS
+MAX_DETECTIONS = 300
+MAX_BOX_SIDE = 7680
+
+_export_lock = threading.Lock()
+
+def onnx_weights_path(weights_path=YOLO_WEIGHTS, quantize=ONNX_QUANTIZE):
+    """Where the exported model for a weights file lives"""
+    if ONNX_WEIGHTS:
+        return ONNX_WEIGHTS
+    base = os.path.splitext(weights_path)[0]
+    return f"{base}.int8.onnx" if quantize else f"{base}.onnx"
+
+def export_onnx(weights_path=YOLO_WEIGHTS, quantize=ONNX_QUANTIZE, imgsz=DETECTION_IMGSZ):
+    """Export PyTorch weights to ONNX once, optionally int8-quantized
+
+    Exporting needs ultralytics (and onnxruntime to quantize). An existing
+    export is reused unless the PyTorch weights are newer, so servers that
+    only have onnxruntime installed just need the exported file.
+    """
+    onnx_path = onnx_weights_path(weights_path, quantize)
+    with _export_lock:
+        if os.path.exists(onnx_path) and (
+            not os.path.exists(weights_path) or
+            os.path.getmtime(onnx_path) >= os.path.getmtime(weights_path)
+        ):
+            return onnx_path
+
+        try:
+            from ultralytics import YOLO
+        except ImportError:
+            if os.path.exists(onnx_path):
+                print(f"Warning: {onnx_path} is older than {weights_path} but ultralytics isn't installed to re-export it")
+                return onnx_path
+            raise
+
+        # Dynamic axes let several pages or tiles share one forward pass
+        exported = YOLO(weights_path).export(format='onnx', imgsz=imgsz, dynamic=True)
+        if quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            tmp_path = f"{onnx_path}.tmp"
+            quantize_dynamic(exported, tmp_path, weight_type=QuantType.QUInt8)
+            os.replace(tmp_path, onnx_path)
+        elif os.path.abspath(exported) != os.path.abspath(onnx_path):
+            os.replace(exported, onnx_path)
+        return onnx_path
+
+def _resize_linear(array, width, height):
+    """Bilinear resize without antialiasing, like cv2.INTER_LINEAR
+
+    PIL's BILINEAR filter widens its kernel when downscaling, which blurs
+    thin lines that ultralytics' cv2 preprocessing keeps. OpenCV is used
+    when it is installed; otherwise the same sampling is done in numpy.
+    """
+    try:
+        import cv2
+        return cv2.resize(array, (width, height), interpolation=cv2.INTER_LINEAR)
+    except ImportError:
+        pass
+
+    def taps(size_out, size_in):
+        # Pixel centres line up the same way as in OpenCV
+        pos = np.clip((np.arange(size_out) + 0.5) * (size_in / size_out) - 0.5, 0, size_in - 1)
+        low = np.floor(pos).astype(int)
+        high = np.minimum(low + 1, size_in - 1)
+        return low, high, (pos - low).astype(np.float32)
+
+    y0, y1, fy = taps(height, array.shape[0])
+    x0, x1, fx = taps(width, array.shape[1])
+    fy, fx = fy[:, None, None], fx[None, :, None]
+    rows = array[y0].astype(np.float32) * (1 - fy) + array[y1].astype(np.float32) * fy
+    out = rows[:, x0] * (1 - fx) + rows[:, x1] * fx
+    return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+def letterbox(img, imgsz=DETECTION_IMGSZ, auto=True, stride=MODEL_STRIDE):
+    """Fit an image into the model input without distorting it
+
+    Mirrors ultralytics' LetterBox: with `auto` the image is only padded up
+    to a multiple of the stride instead of to a full square. Returns the
+    padded RGB array.
+    """
+    array = np.asarray(img.convert('RGB'))
+    height, width = array.shape[:2]
+    gain = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * gain)), int(round(height * gain))
+    pad_w, pad_h = imgsz - new_width, imgsz - new_height
+    if auto:
+        pad_w, pad_h = pad_w % stride, pad_h % stride
+    pad_w, pad_h = pad_w / 2, pad_h / 2
+
+    if (new_width, new_height) != (width, height):
+        array = _resize_linear(array, new_width, new_height)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+
+    canvas = np.empty((new_height + top + bottom, new_width + left + right, 3), dtype=np.uint8)
+    canvas[:] = LETTERBOX_FILL
+    canvas[top:top + new_height, left:left + new_width] = array
+    return canvas
+
+def unletterbox_boxes(boxes, input_size, size):
+    """Map xyxy boxes on a letterboxed input back to the original image
+
+    The padding is worked out from the input size the same way as
+    ultralytics' scale_boxes, so both backends place boxes identically.
+    """
+    gain = min(input_size[0] / size[0], input_size[1] / size[1])
+    pad_x = round((input_size[0] - size[0] * gain) / 2 - 0.1)
+    pad_y = round((input_size[1] - size[1] * gain) / 2 - 0.1)
+    boxes = (boxes - np.array([pad_x, pad_y, pad_x, pad_y])) / gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, size[0])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, size[1])
+    return boxes
+
+class OnnxDetector:
+    """YOLOv8 detector running on ONNX Runtime's CPU provider
+
+    Called with one image or a list, it returns an (xyxy boxes, confidences)
+    pair of numpy arrays per image in that image's pixel coordinates.
+    """
+
+    def __init__(self, onnx_path, imgsz=DETECTION_IMGSZ, conf=DETECTION_CONF,
+                 iou=DETECTION_IOU, threads=ONNX_THREADS):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # A static batch dimension means the export can only take one image
+        self.batched = not isinstance(model_input.shape[0], int) or model_input.shape[0] > 1
+        # Only a dynamic export accepts the smaller rectangular inputs
+        self.dynamic_size = not all(isinstance(dim, int) for dim in model_input.shape[2:])
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def _letterbox(self, img, auto):
+        canvas = letterbox(img, self.imgsz, auto)
+        return canvas.astype(np.float32).transpose(2, 0, 1) / 255.0
+
+    def _postprocess(self, pred, input_size, size):
+        """Decode one image's (4 + classes, anchors) output into page boxes"""
+        pred = pred.T
+        class_scores = pred[:, 4:]
+        classes = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(pred)), classes]
+        keep = scores > self.conf
+        pred, scores, classes = pred[keep], scores[keep], classes[keep]
+
+        cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        # Offsetting by class keeps NMS from merging boxes of different classes
+        offsets = (classes * MAX_BOX_SIDE)[:, None]
+        kept = nms(boxes + offsets, scores, self.iou, contained_ratio=None)[:MAX_DETECTIONS]
+        boxes, scores = boxes[kept], scores[kept]
+
+        return unletterbox_boxes(boxes, input_size, size), scores
+
+    def __call__(self, images):
+        if isinstance(images, Image.Image):
+            images = [images]
+
+        # Like ultralytics, pad to a rectangle only when a batch shares one shape
+        auto = self.dynamic_size and len({img.size for img in images}) == 1
+        inputs = [self._letterbox(img, auto) for img in images]
+        if self.batched:
+            outputs = self.session.run(None, {self.input_name: np.stack(inputs)})[0]
+        else:
+            outputs = [self.session.run(None, {self.input_name: t[None]})[0][0] for t in inputs]
+
+        return [
+            self._postprocess(pred, (t.shape[2], t.shape[1]), img.size)
+            for pred, t, img in zip(outputs, inputs, images)
+        ]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the YOLO weights to ONNX for the onnx detector backend')
+    parser.add_argument('--weights', default=YOLO_WEIGHTS)
+    parser.add_argument('--quantize', action='store_true', help='also quantize the export to int8')
+    args = parser.parse_args()
+    print(export_onnx(args.weights, quantize=args.quantize or ONNX_QUANTIZE))
@@ -1,66 +1,503 @@
+import io
 import os
+import re
 import json
 import time
+import subprocess
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
 from uuid import uuid4
-from pdf2image import convert_from_path
+import numpy as np
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
 from Evaluation_System_APP.config import (
     UPLOAD_FOLDER, THUMBNAILS_FOLDER, ANNOTATIONS_FOLDER,
-    PDF_DPI, THUMBNAIL_DPI, METADATA_DPI
+    PDF_DPI, THUMBNAIL_DPI, METADATA_DPI, THUMBNAIL_BATCH_PAGES, THUMBNAIL_WORKERS,
+    THUMBNAIL_WIDTH, LAZY_THUMBNAILS, DETECTION_BATCH_SIZE, CROP_STORAGE,
+    YOLO_WEIGHTS, DETECTOR_BACKEND, DETECTION_CACHE, DETECTION_DPI,
+    CROP_DPI, CROP_MAX_SIDE, CROP_RENDER_WORKERS, OCR_PREFETCH, OCR_TIMEOUT
 )
+from Evaluation_System_APP.models.job_queue import (
+    submit_job, get_job_status, is_job_stalled, is_job_running_elsewhere, fail_job
+)
+from Evaluation_System_APP.models.content_store import (
+    find_upload_by_hash, register_upload_hash, link_or_copy
+)
+from Evaluation_System_APP.models.upload_stream import save_stream, UploadError
+from Evaluation_System_APP.models.image_encoding import save_image_variants, variant_paths
+from Evaluation_System_APP.models.thumbnail_atlas import build_thumbnail_atlases
+from Evaluation_System_APP.models.model_registry import get_model, model_lock
+from Evaluation_System_APP.models.inference_pool import start_inference_pool, get_inference_pool
+from Evaluation_System_APP.models.project import get_detection_settings
+from Evaluation_System_APP.models.sheet_pipeline import SheetPipeline
+from Evaluation_System_APP.models.sheet_lock import sheet_lock, SheetBusy
+from Evaluation_System_APP.models.detection_cache import DetectionCache, detection_key, file_hash
+from Evaluation_System_APP.models.tiling import tile_grid, touches_seam, merge_tile_boxes
+from Evaluation_System_APP.models.raster_cache import get_page_raster, get_page_region, render_region
+from Evaluation_System_APP.models.onnx_detector import OnnxDetector, export_onnx
+from Evaluation_System_APP.models.ocr_store import load_ocr_lines
+from Evaluation_System_APP.models.ocr_prefetch import OcrPrefetcher, PRIORITY_VIEWING, PRIORITY_PREFETCH
+
+# process_sheet's answer when another caller is already processing the sheet
+SHEET_BUSY = 'Sheet is already being processed'
 
 # Import YOLO and Azure client in a way that allows for lazy loading
 # This helps avoid loading these heavy dependencies unless needed
-def get_yolo():
+def _load_yolo(weights_path):
     from ultralytics import YOLO
-    from Evaluation_System_APP.config import YOLO_WEIGHTS
-    return YOLO(YOLO_WEIGHTS)
-
-def get_cv_client():
-    from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-    from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
-    from msrest.authentication import CognitiveServicesCredentials
-    from Evaluation_System_APP.config import AZURE_ENDPOINT, AZURE_KEY
-    return ComputerVisionClient(
-        AZURE_ENDPOINT,
-        CognitiveServicesCredentials(AZURE_KEY)
-    ), OperationStatusCodes
+    return YOLO(weights_path)
 
-def process_uploaded_pdf(file, project_id):
-    """Process an uploaded PDF file"""
-    upload_id = uuid4().hex
+def _load_detector(weights_path):
+    """Load weights with the configured detector backend"""
+    if DETECTOR_BACKEND == 'onnx':
+        return OnnxDetector(weights_path)
+    return _load_yolo(weights_path)
+
+_detector_weights = None
+_detector_weights_lock = threading.Lock()
+
+def detector_weights():
+    """Weights file for the configured backend, exporting to ONNX on first use
+
+    Resolved once per process so detection calls don't re-check the export.
+    """
+    global _detector_weights
+    with _detector_weights_lock:
+        if _detector_weights is None:
+            _detector_weights = export_onnx() if DETECTOR_BACKEND == 'onnx' else YOLO_WEIGHTS
+        return _detector_weights
+
+def get_yolo():
+    """Get the process-wide detector, loading the weights on first use"""
+    return get_model(detector_weights(), _load_detector)
+
+def preload_detector():
+    """Load and warm up the detector in dedicated workers at startup"""
+    return start_inference_pool(_load_detector, weights_path=detector_weights())
+
+def run_yolo(images):
+    """Run the shared YOLO model; inference on one instance is serialized"""
+    # Prefer the warmed-up workers when they were started
+    pool = get_inference_pool()
+    if pool:
+        return pool.run(images)
+
+    yolo = get_yolo()
+    with model_lock(yolo):
+        return yolo(images)
+
+_PAGE_SIZE_RE = re.compile(r'^Page\s+(\d+)\s+size:\s+([\d.]+)\s+x\s+([\d.]+)')
+_PAGE_ROT_RE = re.compile(r'^Page\s+(\d+)\s+rot:\s+(-?\d+)')
+
+def _probe_by_rendering(pdf_path, total_pages):
+    """Fallback probe that rasterizes each page at METADATA_DPI to measure it"""
+    page_sizes = []
+    for page_num in range(1, total_pages + 1):
+        page = convert_from_path(
+            pdf_path, dpi=METADATA_DPI,
+            first_page=page_num, last_page=page_num,
+            thread_count=1
+        )[0]
+        # The render already has rotation applied
+        page_sizes.append({
+            'width_pts': round(page.width * 72 / METADATA_DPI, 2),
+            'height_pts': round(page.height * 72 / METADATA_DPI, 2),
+            'rotation': 0
+        })
+        page.close()
+    return page_sizes
+
+def probe_pdf(pdf_path):
+    """Read page count, page sizes and rotation from the PDF structure"""
+    total_pages = pdfinfo_from_path(pdf_path)['Pages']
+
+    # pdfinfo reports per-page boxes when given a page range
+    sizes, rotations = {}, {}
+    try:
+        out = subprocess.run(
+            ['pdfinfo', '-f', '1', '-l', str(total_pages), pdf_path],
+            capture_output=True, check=True, timeout=60
+        ).stdout.decode('utf8', 'ignore')
+        for line in out.splitlines():
+            size_match = _PAGE_SIZE_RE.match(line)
+            if size_match:
+                sizes[int(size_match.group(1))] = (
+                    float(size_match.group(2)), float(size_match.group(3))
+                )
+                continue
+            rot_match = _PAGE_ROT_RE.match(line)
+            if rot_match:
+                rotations[int(rot_match.group(1))] = int(rot_match.group(2)) % 360
+    except Exception as e:
+        print(f"Error reading page sizes with pdfinfo: {e}")
+
+    if len(sizes) < total_pages:
+        page_sizes = _probe_by_rendering(pdf_path, total_pages)
+    else:
+        page_sizes = [
+            {
+                'width_pts': sizes[n][0],
+                'height_pts': sizes[n][1],
+                'rotation': rotations.get(n, 0)
+            }
+            for n in range(1, total_pages + 1)
+        ]
+
+    return {'total_pages': total_pages, 'page_sizes': page_sizes}
+
+def page_pixel_size(meta, page_num, dpi):
+    """Planned (width, height) in pixels of a rendered page, or None if unknown"""
+    page_sizes = meta.get('page_sizes')
+    if not page_sizes or page_num > len(page_sizes):
+        return None
+
+    size = page_sizes[page_num - 1]
+    width = int(round(size['width_pts'] * dpi / 72))
+    height = int(round(size['height_pts'] * dpi / 72))
+    # Poppler renders rotated pages with their sides swapped
+    if size['rotation'] in (90, 270):
+        width, height = height, width
+    return width, height
+
+def thumbnail_pixel_size(meta, page_num):
+    """(width, height) a page's thumbnail is rendered at, or None if unknown"""
+    size = page_pixel_size(meta, page_num, THUMBNAIL_DPI)
+    if not size or not THUMBNAIL_WIDTH:
+        return size
+    # Thumbnails are scaled to a fixed width, keeping the page's aspect ratio
+    width, height = size
+    return THUMBNAIL_WIDTH, max(1, int(round(height * THUMBNAIL_WIDTH / width)))
+
+def _save_thumbnail(page, thumbs_dir, page_num):
+    """Encode a thumbnail in every configured format, atomically"""
+    return save_image_variants(page, os.path.join(thumbs_dir, f"page_{page_num}"))
+
+def render_thumbnails(pdf_path, thumbs_dir, first_page, last_page, progress=None):
+    """Render thumbnails for a page range, a small window of pages at a time"""
+    page_thumbs = []
+    for start in range(first_page, last_page + 1, THUMBNAIL_BATCH_PAGES):
+        end = min(start + THUMBNAIL_BATCH_PAGES - 1, last_page)
+        try:
+            # Rasterize straight to the target width rather than rendering
+            # a full 72 DPI sheet and scaling it down
+            pages = convert_from_path(
+                pdf_path, dpi=THUMBNAIL_DPI,
+                first_page=start, last_page=end,
+                size=(THUMBNAIL_WIDTH, None) if THUMBNAIL_WIDTH else None,
+                thread_count=1
+            )
+        except Exception as e:
+            # Without a progress tracker there is nobody to report to
+            if progress is None:
+                raise
+            progress.error(f"Pages {start}-{end}: {e}")
+            continue
+
+        for offset, page in enumerate(pages):
+            fn = _save_thumbnail(page, thumbs_dir, start + offset)
+            page.close()
+            page_thumbs.append(fn)
+            if progress:
+                progress.page_done(start + offset)
+
+        # Free memory before rendering the next window
+        pages = None
+    return page_thumbs
+
+def _page_ranges(pages, parts):
+    """Split sorted page numbers into about `parts` contiguous (first, last) ranges"""
+    size = -(-len(pages) // parts)  # Ceiling division
+    ranges = []
+    for i in range(0, len(pages), size):
+        chunk = pages[i:i + size]
+        first = prev = chunk[0]
+        for page_num in chunk[1:]:
+            # Pages finished by an earlier run leave gaps
+            if page_num != prev + 1:
+                ranges.append((first, prev))
+                first = page_num
+            prev = page_num
+        ranges.append((first, prev))
+    return ranges
+
+def generate_thumbnails(pdf_path, thumbs_dir, total_pages, workers=None, progress=None, pages=None):
+    """Render thumbnails, splitting the pages across worker processes
+
+    `pages` limits rendering to the given page numbers, e.g. the ones an
+    interrupted run didn't finish.
+    """
+    workers = THUMBNAIL_WORKERS if workers is None else workers
+    pages = sorted(pages) if pages is not None else list(range(1, total_pages + 1))
+    if not pages:
+        return []
+    if workers <= 1 or len(pages) <= 1:
+        page_thumbs = []
+        for first, last in _page_ranges(pages, 1):
+            page_thumbs.extend(render_thumbnails(pdf_path, thumbs_dir, first, last, progress=progress))
+        return page_thumbs
+
+    # Use a few more slices than workers so a slice of dense sheets doesn't
+    # leave the other workers idle at the end
+    ranges = _page_ranges(pages, min(workers * 4, len(pages)))
+    slice_thumbs = {}
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)),
+        mp_context=multiprocessing.get_context('spawn')
+    ) as pool:
+        futures = {
+            pool.submit(render_thumbnails, pdf_path, thumbs_dir, first, last): (first, last)
+            for first, last in ranges
+        }
+        for future in as_completed(futures):
+            first, last = futures[future]
+            try:
+                slice_thumbs[first] = future.result()
+            except Exception as e:
+                if progress is None:
+                    raise
+                progress.error(f"Pages {first}-{last}: {e}")
+                continue
+            if progress:
+                for page_num in range(first, last + 1):
+                    progress.page_done(page_num)
+
+    # Merge the slices back in page order
+    page_thumbs = []
+    for first in sorted(slice_thumbs):
+        page_thumbs.extend(slice_thumbs[first])
+    return page_thumbs
+
+# (upload_id, page_num) -> [lock, callers holding or waiting on it]; an
+# entry is dropped when its last caller leaves
+_thumbnail_locks = {}
+_thumbnail_locks_guard = threading.Lock()
+
+def ensure_thumbnail(upload_id, page_num):
+    """Render a single thumbnail on demand if it isn't on disk yet
+
+    Concurrent callers for the same page wait on one render instead of
+    each starting their own.
+    """
+    thumbs_dir = os.path.join(THUMBNAILS_FOLDER, upload_id)
+    fn = f"page_{page_num}.png"
+    if os.path.exists(os.path.join(thumbs_dir, fn)):
+        return fn
+
+    meta = get_pdf_metadata(upload_id)
+    if not meta or page_num < 1 or page_num > meta['total_pages']:
+        return None
+
+    key = (upload_id, page_num)
+    with _thumbnail_locks_guard:
+        entry = _thumbnail_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+
+    try:
+        with entry[0]:
+            # Another request may have rendered it while we waited
+            if os.path.exists(os.path.join(thumbs_dir, fn)):
+                return fn
+
+            os.makedirs(thumbs_dir, exist_ok=True)
+            pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
+            try:
+                render_thumbnails(pdf_path, thumbs_dir, page_num, page_num)
+            except Exception as e:
+                print(f"Error rendering thumbnail for page {page_num}: {e}")
+                return None
+        return fn
+    finally:
+        with _thumbnail_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _thumbnail_locks[key]
+
+def run_ingest_job(upload_id, progress=None):
+    """Generate thumbnails for an upload as a background job
+
+    Thumbnails are written atomically, so a page file on disk is its
+    checkpoint: a resumed run only renders the pages that are missing.
+    """
+    meta = get_pdf_metadata(upload_id)
     pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
-    file.save(pdf_path)
+    thumbs_dir = os.path.join(THUMBNAILS_FOLDER, upload_id)
+    os.makedirs(thumbs_dir, exist_ok=True)
+
+    done, missing = [], []
+    for page_num in range(1, meta['total_pages'] + 1):
+        if os.path.exists(os.path.join(thumbs_dir, f"page_{page_num}.png")):
+            done.append(page_num)
+        else:
+            missing.append(page_num)
+    if progress:
+        progress.skip_pages(done)
+
+    generate_thumbnails(pdf_path, thumbs_dir, meta['total_pages'], progress=progress, pages=missing)
+
+    # Sprite atlases need every page; pages that failed still load one by one
+    if not progress or not progress.job['errors']:
+        build_thumbnail_atlases(upload_id, meta['total_pages'])
+
+def resume_ingest(upload_id, force=False):
+    """Finish an interrupted or failed ingestion, rendering only missing pages"""
+    meta = get_pdf_metadata(upload_id)
+    if not meta:
+        return False, 'Invalid upload ID'
+
+    job = get_job_status(upload_id, 'ingest')
+    if not force and job and job['state'] in ('queued', 'running') and not is_job_stalled(job):
+        return False, 'Ingestion is still running'
+
+    submit_job(upload_id, 'ingest', meta['total_pages'], run_ingest_job, upload_id, resume=True)
+    return True, None
+
+def _interrupted_jobs(kind):
+    """(upload_id, job) of jobs left queued or running by a crash or restart"""
+    suffix = f"_{kind}_job.json"
+    for fn in os.listdir(UPLOAD_FOLDER):
+        if not fn.endswith(suffix):
+            continue
+        upload_id = fn[:-len(suffix)]
+        job = get_job_status(upload_id, kind)
+        # Nothing in a freshly started process can be running it, but
+        # another worker process may be
+        if job and job['state'] in ('queued', 'running') and not is_job_running_elsewhere(upload_id, kind):
+            yield upload_id, job
+
+def resume_interrupted_ingests():
+    """Re-queue ingestion jobs left unfinished by a crash or restart"""
+    resumed = []
+    for upload_id, _ in _interrupted_jobs('ingest'):
+        success, _ = resume_ingest(upload_id, force=True)
+        if success:
+            resumed.append(upload_id)
+    if resumed:
+        print(f"Resumed {len(resumed)} interrupted ingestion job(s)")
+    return resumed
+
+def resume_interrupted_sheets():
+    """Re-queue the unfinished pages of batch sheet jobs cut off by a restart
+
+    Jobs from before their page list was saved can't be resumed and are
+    marked failed, so the page offers "Process All Sheets" again.
+    """
+    resumed = []
+    for upload_id, job in _interrupted_jobs('sheets'):
+        if 'pages' not in job or not get_pdf_metadata(upload_id):
+            fail_job(upload_id, 'sheets', 'Interrupted by a restart')
+            continue
+        completed = set(job['completed_pages'])
+        remaining = [page_num for page_num in job['pages'] if page_num not in completed]
+        submit_job(
+            upload_id, 'sheets', job['total_pages'], run_sheets_job,
+            upload_id, remaining, job.get('reprocess', False), resume=True
+        )
+        resumed.append(upload_id)
+    if resumed:
+        print(f"Resumed {len(resumed)} interrupted sheet processing job(s)")
+    return resumed
+
+def _adopt_derived_artifacts(upload_id, source_id, total_pages):
+    """Reuse thumbnails and crops from an upload of the same PDF
 
-    # Create thumbnails directory
+    Files are hard-linked so no pixels are duplicated on disk, while crop
+    completion and annotations start fresh in the new upload's namespace.
+    Linked files are only ever replaced, never rewritten in place, so
+    reprocessing one upload can't change the other's images.
+    Returns True if every thumbnail was available.
+    """
+    source_thumbs = os.path.join(THUMBNAILS_FOLDER, source_id)
     thumbs_dir = os.path.join(THUMBNAILS_FOLDER, upload_id)
     os.makedirs(thumbs_dir, exist_ok=True)
-    
-    # Get total pages and generate thumbnails
+    thumbs_adopted = 0
+    for page_num in range(1, total_pages + 1):
+        if not os.path.exists(os.path.join(source_thumbs, f"page_{page_num}.png")):
+            continue
+        for src in variant_paths(os.path.join(source_thumbs, f"page_{page_num}")):
+            link_or_copy(src, os.path.join(thumbs_dir, os.path.basename(src)))
+        thumbs_adopted += 1
+
+    # The sprite atlases only exist once every thumbnail does
+    if thumbs_adopted == total_pages and os.path.isdir(source_thumbs):
+        for fn in os.listdir(source_thumbs):
+            if fn.startswith('atlas') and not fn.endswith('.tmp'):
+                link_or_copy(os.path.join(source_thumbs, fn), os.path.join(thumbs_dir, fn))
+
+    for page_num in range(1, total_pages + 1):
+        source_crops = os.path.join(UPLOAD_FOLDER, f"{source_id}_page{page_num}_crops")
+        source_meta_path = os.path.join(source_crops, 'crops.json')
+        if not os.path.exists(source_meta_path):
+            continue
+
+        crops_dir = os.path.join(UPLOAD_FOLDER, f"{upload_id}_page{page_num}_crops")
+        os.makedirs(crops_dir, exist_ok=True)
+        with open(source_meta_path) as f:
+            crops_meta = json.load(f)
+        for fn in crops_meta['crops']:
+            src = os.path.join(source_crops, fn)
+            if os.path.exists(src):
+                link_or_copy(src, os.path.join(crops_dir, fn))
+
+        crops_meta['upload_id'] = upload_id
+        crops_meta['completed_crops'] = []
+        with open(os.path.join(crops_dir, 'crops.json'), 'w') as f:
+            json.dump(crops_meta, f, indent=2)
+
+    return thumbs_adopted == total_pages
+
+def process_uploaded_pdf(file, project_id):
+    """Process an uploaded PDF file
+
+    Raises UploadError (UploadTooLarge for oversized files) when the upload
+    itself is rejected, so the caller can answer with a client error.
+    """
+    upload_id = uuid4().hex
     try:
-        # Use a lower DPI for thumbnails
-        pages = convert_from_path(pdf_path, dpi=THUMBNAIL_DPI)
-        total_pages = len(pages)
-        
-        # Generate thumbnails
-        page_thumbs = []
-        for i, page in enumerate(pages):
-            thumb_path = os.path.join(thumbs_dir, f"page_{i+1}.png")
-            page.save(thumb_path, "PNG")
-            page_thumbs.append(f"page_{i+1}.png")
-        
-        # Free memory
-        pages = None
+        # Copy in fixed-size chunks, hashing as we go
+        pdf_path, content_hash = save_stream(file.stream, upload_id)
+    except UploadError:
+        raise
     except Exception as e:
-        print(f"Error converting PDF: {e}")
-        return False, f"Error processing PDF: {str(e)}"
+        print(f"Error saving PDF: {e}")
+        return False, f"Error saving PDF: {str(e)}"
+
+    return ingest_pdf(upload_id, pdf_path, file.filename, project_id, content_hash)
 
-    # Save metadata
+def ingest_pdf(upload_id, pdf_path, filename, project_id, content_hash):
+    """Register a PDF already written to the uploads folder and queue its thumbnails"""
+    # Identical drawing sets are often uploaded to several projects; reuse
+    # the work already done for an earlier copy
+    source_id = find_upload_by_hash(content_hash)
+    source_meta = get_pdf_metadata(source_id) if source_id else None
+
+    if source_meta:
+        link_or_copy(os.path.join(UPLOAD_FOLDER, f"{source_id}.pdf"), pdf_path)
+        probe = {
+            'total_pages': source_meta['total_pages'],
+            'page_sizes': source_meta.get('page_sizes')
+        }
+    else:
+        # Read the page count and sizes from the PDF structure without
+        # rasterizing anything
+        try:
+            probe = probe_pdf(pdf_path)
+        except Exception as e:
+            print(f"Error reading PDF: {e}")
+            return False, f"Error processing PDF: {str(e)}"
+
+    # Save metadata; thumbnails are listed up front and filled in by the
+    # background ingestion job or on demand
     meta = {
         'upload_id': upload_id,
-        'filename': file.filename,
-        'total_pages': total_pages,
+        'project_id': project_id,
+        'filename': filename,
+        'content_hash': content_hash,
+        'source_upload_id': source_id if source_meta else None,
+        'total_pages': probe['total_pages'],
+        'page_sizes': probe['page_sizes'],
         'processed_pages': [],
-        'thumbnails': page_thumbs
+        'thumbnails': [f"page_{i}.png" for i in range(1, probe['total_pages'] + 1)]
     }
     
     # Create metadata file
@@ -68,6 +505,17 @@ def process_uploaded_pdf(file, project_id):
     with open(meta_path, 'w') as f:
         json.dump(meta, f, indent=2)
 
+    register_upload_hash(content_hash, upload_id)
+
+    thumbs_complete = False
+    if source_meta:
+        thumbs_complete = _adopt_derived_artifacts(upload_id, source_id, probe['total_pages'])
+
+    # In lazy mode thumbnails are rendered by the thumbnails route the first
+    # time a page is viewed
+    if not LAZY_THUMBNAILS and not thumbs_complete:
+        submit_job(upload_id, 'ingest', probe['total_pages'], run_ingest_job, upload_id)
+
     return True, upload_id
 
 def get_pdf_metadata(upload_id):
@@ -110,8 +558,200 @@ def get_page_progress(upload_id, meta):
     
     return page_progress
 
-def process_sheet(upload_id, page_num):
-    """Process a single sheet (page) from a PDF"""
+def detect_boxes(images):
+    """Run detection on a batch of page images in one forward pass
+
+    Returns an (N, 4) integer array of x1, y1, x2, y2 boxes per image.
+    """
+    return [
+        _boxes_and_scores(dets)[0].astype(int)
+        for dets in run_yolo(list(images))
+    ]
+
+def _boxes_and_scores(dets):
+    """(xyxy boxes, confidences) as numpy arrays from either detector backend"""
+    if isinstance(dets, tuple):
+        return dets
+    return dets.boxes.xyxy.cpu().numpy(), dets.boxes.conf.cpu().numpy()
+
+def detect_boxes_tiled(upload_id, page_num, settings):
+    """Run detection on overlapping tiles of a page rendered at the tile DPI
+
+    Tiles go through the model in batches, their boxes are mapped back to
+    the page and merged across seams. Returns boxes in PDF_DPI sheet
+    coordinates, the same space as detect_boxes.
+    """
+    page = render_for_tiling(upload_id, page_num, settings)
+    try:
+        return detect_boxes_in_tiles(page, settings)
+    finally:
+        page.close()
+
+def render_for_tiling(upload_id, page_num, settings, cache=True):
+    """Render a page at the tile DPI"""
+    # Line drawings lose nothing in grayscale, which keeps the high-DPI
+    # render at a third of the memory
+    return get_page_raster(upload_id, page_num, settings['tile_dpi'], grayscale=True, cache=cache)
+
+def detect_boxes_in_tiles(page, settings):
+    """Tiled detection on a page already rendered at the tile DPI"""
+    tiles = tile_grid(page.width, page.height, settings['tile_size'], settings['tile_overlap'])
+    boxes, scores, clipped = [], [], []
+    for i in range(0, len(tiles), DETECTION_BATCH_SIZE):
+        batch = tiles[i:i + DETECTION_BATCH_SIZE]
+        images = [page.crop(tile).convert('RGB') for tile in batch]
+        try:
+            results = run_yolo(images)
+        finally:
+            for img in images:
+                img.close()
+
+        for tile, dets in zip(batch, results):
+            offset = np.array([tile[0], tile[1], tile[0], tile[1]])
+            for box, score in zip(*_boxes_and_scores(dets)):
+                boxes.append(box + offset)
+                scores.append(score)
+                clipped.append(touches_seam(box, tile, page.size))
+
+    merged = merge_tile_boxes(boxes, scores, clipped, settings['tile_nms_iou'])
+    return to_sheet_coords(merged, settings['tile_dpi'])
+
+def to_sheet_coords(boxes, dpi):
+    """Scale boxes found on a render at `dpi` to PDF_DPI sheet coordinates"""
+    return np.round(np.asarray(boxes) * PDF_DPI / dpi).astype(int)
+
+def detect_page_boxes(upload_ids, pages):
+    """Full-page detection at DETECTION_DPI for several pages in one pass
+
+    Returns boxes in PDF_DPI sheet coordinates. The page renders are freed
+    as soon as the model has run.
+    """
+    images = [
+        get_page_raster(upload_id, page_num, DETECTION_DPI)
+        for upload_id, page_num in zip(upload_ids, pages)
+    ]
+    try:
+        batch_boxes = detect_boxes(images)
+    finally:
+        for img in images:
+            img.close()
+    return [to_sheet_coords(boxes, DETECTION_DPI) for boxes in batch_boxes]
+
+def crop_dpi_for(box):
+    """DPI to render a figure at, lowered for figures too big for OCR"""
+    longest_side_in = max(box['x2'] - box['x1'], box['y2'] - box['y1']) / PDF_DPI
+    if longest_side_in <= 0:
+        return CROP_DPI
+    return max(1, min(CROP_DPI, int(CROP_MAX_SIDE / longest_side_in)))
+
+def _render_crop(upload_id, page_num, box, dpi):
+    """Render one figure straight from the PDF"""
+    factor = dpi / PDF_DPI
+    return render_region(
+        upload_id, page_num, dpi,
+        [int(round(box[k] * factor)) for k in ('x1', 'y1', 'x2', 'y2')]
+    )
+
+def _save_crop(upload_id, page_num, box, crops_dir, fn):
+    crop = _render_crop(upload_id, page_num, box, box['crop_dpi'])
+    path = os.path.join(crops_dir, fn)
+    # Crop files can be hard-linked into duplicate uploads; replacing the
+    # file instead of writing into it leaves their copies untouched
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        crop.save(tmp_path, 'PNG')
+        os.replace(tmp_path, path)
+    finally:
+        crop.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _write_sheet_crops(upload_id, page_num, boxes, sheet_size=None, detection=None):
+    """Render detected figures at CROP_DPI and save crops.json
+
+    Boxes are in PDF_DPI sheet coordinates. Each figure is rendered on its
+    own from the PDF, so no full high-DPI page is ever held in memory. With
+    virtual crop storage only the boxes are saved, and crops are cut from a
+    cached page raster at crop DPI when requested (see load_crop_image).
+    """
+    # Create crops directory for this page
+    crops_dir = os.path.join(UPLOAD_FOLDER, f"{upload_id}_page{page_num}_crops")
+    os.makedirs(crops_dir, exist_ok=True)
+
+    crop_list = []
+    yolo_boxes = []  # Store YOLO detection coordinates
+    
+    for i, box in enumerate(boxes):
+        x1,y1,x2,y2 = box.tolist()
+        # Boxes scaled from another DPI can land a pixel past the edge
+        if sheet_size:
+            x2, y2 = min(x2, sheet_size[0]), min(y2, sheet_size[1])
+        crop_list.append(f"crop_{i}.png")
+        yolo_box = {
+            'crop_id': i,
+            'x1': int(x1),
+            'y1': int(y1),
+            'x2': int(x2),
+            'y2': int(y2)
+        }
+        yolo_box['crop_dpi'] = crop_dpi_for(yolo_box)  # Resolution of the crop image
+        yolo_boxes.append(yolo_box)
+
+    if CROP_STORAGE != 'virtual' and yolo_boxes:
+        with ThreadPoolExecutor(CROP_RENDER_WORKERS) as pool:
+            # list() re-raises the first rendering error
+            list(pool.map(
+                lambda item: _save_crop(upload_id, page_num, item[0], crops_dir, item[1]),
+                zip(yolo_boxes, crop_list)
+            ))
+
+    # Save crops metadata with completion tracking and YOLO boxes
+    crops_meta = {
+        'upload_id': upload_id,
+        'page_num': page_num,
+        'crops': crop_list,
+        'completed_crops': [],  # Track which crops are completed
+        'yolo_boxes': yolo_boxes,  # Save YOLO detection coordinates
+        'total_figures': len(crop_list),  # Add total figures count
+        'detection': detection or {'mode': 'full'},  # How the boxes were found
+        'storage': CROP_STORAGE,  # 'virtual' crops have no image files
+        'dpi': PDF_DPI  # Resolution the box coordinates refer to
+    }
+    
+    # Save the metadata
+    meta_file = os.path.join(crops_dir, 'crops.json')
+    tmp_file = f"{meta_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(crops_meta, f, indent=2)
+    # Readers never see a half-written file
+    os.replace(tmp_file, meta_file)
+
+def detection_cache_for(upload_id, meta, settings):
+    """Detection cache for an upload's PDF under the current settings and weights
+
+    Returns None when caching is disabled or the key can't be computed.
+    """
+    if not DETECTION_CACHE:
+        return None
+    try:
+        pdf_hash = meta.get('content_hash') or file_hash(os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf"))
+        dpi = settings['tile_dpi'] if settings['mode'] == 'tiled' else DETECTION_DPI
+        return DetectionCache(pdf_hash, detection_key(detector_weights(), dpi, settings))
+    except Exception as e:
+        print(f"Error opening detection cache: {e}")
+        return None
+
+def crops_metadata_complete(crops_meta):
+    """Whether a sheet's crops.json was fully written"""
+    return bool(crops_meta) and all(key in crops_meta for key in ['crops', 'completed_crops', 'total_figures'])
+
+def process_sheet(upload_id, page_num, wait=True):
+    """Process a single sheet (page) from a PDF
+
+    Only one caller processes a sheet at a time, across worker processes.
+    Callers arriving meanwhile wait and reuse its result, or with
+    `wait=False` get (False, SHEET_BUSY) straight away.
+    """
     # Load metadata
     meta_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}_metadata.json")
     if not os.path.exists(meta_path):
@@ -124,63 +764,121 @@ def process_sheet(upload_id, page_num):
         return False, 'Invalid page number'
 
     try:
-        # Convert specific page to image
-        pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
-        pil_img = convert_from_path(
-            pdf_path, dpi=PDF_DPI,
-            first_page=page_num, last_page=page_num,
-            fmt='PNG', thread_count=1
-        )[0]
-
-        # Create crops directory for this page
-        crops_dir = os.path.join(UPLOAD_FOLDER, f"{upload_id}_page{page_num}_crops")
-        os.makedirs(crops_dir, exist_ok=True)
+        with sheet_lock(upload_id, page_num, blocking=wait) as waited:
+            # Whoever held the lock has just processed this sheet
+            if waited and crops_metadata_complete(get_crops_metadata(upload_id, page_num)):
+                return True, None
 
-        # Run YOLO detection and save detection coordinates
-        yolo = get_yolo()
-        dets = yolo(pil_img)[0]
-        crop_list = []
-        yolo_boxes = []  # Store YOLO detection coordinates
-        
-        for i, box in enumerate(dets.boxes.xyxy.cpu().numpy().astype(int)):
-            x1,y1,x2,y2 = box.tolist()
-            crop = pil_img.crop((x1,y1,x2,y2))
-            fn = f"crop_{i}.png"
-            crop.save(os.path.join(crops_dir, fn))
-            crop_list.append(fn)
-            yolo_boxes.append({
-                'crop_id': i,
-                'x1': int(x1),
-                'y1': int(y1),
-                'x2': int(x2),
-                'y2': int(y2)
-            })
+            # Run YOLO detection on a low-DPI render, reusing it if cached
+            settings = get_detection_settings(meta.get('project_id'))
+            cache = detection_cache_for(upload_id, meta, settings)
+            boxes = cache.get(page_num) if cache else None
+            if boxes is None:
+                if settings['mode'] == 'tiled':
+                    boxes = detect_boxes_tiled(upload_id, page_num, settings)
+                else:
+                    boxes = detect_page_boxes([upload_id], [page_num])[0]
+                if cache:
+                    cache.put(page_num, boxes)
 
-        # Save crops metadata with completion tracking and YOLO boxes
-        crops_meta = {
-            'upload_id': upload_id,
-            'page_num': page_num,
-            'crops': crop_list,
-            'completed_crops': [],  # Track which crops are completed
-            'yolo_boxes': yolo_boxes,  # Save YOLO detection coordinates
-            'total_figures': len(crop_list)  # Add total figures count
-        }
-        
-        # Save the metadata
-        meta_file = os.path.join(crops_dir, 'crops.json')
-        with open(meta_file, 'w') as f:
-            json.dump(crops_meta, f, indent=2)
+            # Render the figures at high DPI and save them with their coordinates
+            _write_sheet_crops(upload_id, page_num, boxes, page_pixel_size(meta, page_num, PDF_DPI), settings)
 
-        # Free memory
-        pil_img = None
-        dets = None
+        # Have the figures' text ready before the annotator opens them
+        if OCR_PREFETCH:
+            prefetch_sheet_ocr(upload_id, page_num)
         
         return True, None
-        
+
+    except SheetBusy:
+        return False, SHEET_BUSY
     except Exception as e:
         print(f"Error processing sheet {page_num}: {e}")
         return False, f"Error processing sheet: {str(e)}"
 
+def process_sheets_batch(upload_id, pages, batch_size=None, progress=None, reprocess=False):
+    """Detect figures on many sheets, several pages per forward pass
+
+    Rendering, detection and crop writing run as a pipeline so poppler and
+    the crop encoders work while the model is busy. The bounded queues
+    between stages keep memory at a few page renders whatever the page
+    count. In tiled mode each page's tiles form the batches instead.
+    Each page is rendered once here, so the renders skip the raster cache.
+    Sheets finished by someone else in the meantime are left alone unless
+    `reprocess` is set.
+    """
+    meta = get_pdf_metadata(upload_id) or {}
+    settings = get_detection_settings(meta.get('project_id'))
+
+    if settings['mode'] == 'tiled':
+        render = lambda p: render_for_tiling(upload_id, p, settings, cache=False)
+        detect = lambda images: [detect_boxes_in_tiles(img, settings) for img in images]
+        batch_size = 1
+    else:
+        render = lambda p: get_page_raster(upload_id, p, DETECTION_DPI, cache=False)
+        detect = lambda images: [to_sheet_coords(boxes, DETECTION_DPI) for boxes in detect_boxes(images)]
+
+    def write(page_num, boxes):
+        # Don't interleave with someone processing the sheet interactively
+        with sheet_lock(upload_id, page_num):
+            if not reprocess and crops_metadata_complete(get_crops_metadata(upload_id, page_num)):
+                return
+            _write_sheet_crops(upload_id, page_num, boxes, page_pixel_size(meta, page_num, PDF_DPI), settings)
+
+    # Pages detected before under the same key only need their crops written
+    cache = detection_cache_for(upload_id, meta, settings)
+    pending = []
+    for page_num in sorted(pages):
+        boxes = cache.get(page_num) if cache else None
+        if boxes is None:
+            pending.append(page_num)
+            continue
+        try:
+            write(page_num, boxes)
+        except Exception as e:
+            if progress is None:
+                raise
+            progress.error(f"Page {page_num}: {e}")
+            continue
+        if progress:
+            progress.page_done(page_num)
+
+    def cache_and_write(page_num, boxes):
+        if cache:
+            cache.put(page_num, boxes)
+        write(page_num, boxes)
+
+    if pending:
+        SheetPipeline(pending, render, detect, cache_and_write, progress, batch_size=batch_size).run()
+
+def run_sheets_job(upload_id, pages, reprocess=False, progress=None):
+    """Background job that processes a set of sheets in batches"""
+    process_sheets_batch(upload_id, pages, progress=progress, reprocess=reprocess)
+
+def process_all_sheets(upload_id, first_page=None, last_page=None, reprocess=False):
+    """Queue batch processing for a page range of an upload"""
+    meta = get_pdf_metadata(upload_id)
+    if not meta:
+        return False, 'Invalid upload ID'
+
+    first_page = max(1, first_page or 1)
+    last_page = min(meta['total_pages'], last_page or meta['total_pages'])
+    if first_page > last_page:
+        return False, 'Invalid page range'
+
+    pages = [
+        page_num for page_num in range(first_page, last_page + 1)
+        if reprocess or not get_crops_metadata(upload_id, page_num)
+    ]
+    if not pages:
+        return False, 'All sheets in this range are already processed'
+
+    submit_job(
+        upload_id, 'sheets', len(pages), run_sheets_job, upload_id, pages, reprocess,
+        details={'pages': pages, 'reprocess': reprocess}
+    )
+    return True, None
+
 def get_crops_metadata(upload_id, page_num):
     """Get metadata for crops on a page"""
     crops_dir = os.path.join(UPLOAD_FOLDER, f"{upload_id}_page{page_num}_crops")
@@ -192,6 +890,85 @@ def get_crops_metadata(upload_id, page_num):
     with open(meta_path) as f:
         return json.load(f)
 
+def load_crop_image(upload_id, page_num, crop_idx, scale=1.0):
+    """A crop as an image, from its file or rendered from the PDF
+
+    `scale` is relative to the crop's own DPI and is rendered at that
+    resolution rather than resampled, capped so the longest side stays
+    within CROP_MAX_SIDE. Crops at their own DPI are cut from a cached page
+    raster at that DPI, so a sheet's figures share one render; zoomed views
+    only use a raster that is already cached. Returns None for unknown crops.
+    """
+    meta = get_crops_metadata(upload_id, page_num)
+    if not meta or crop_idx >= len(meta['crops']):
+        return None
+
+    crop_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}_page{page_num}_crops", meta['crops'][crop_idx])
+    if scale == 1 and os.path.exists(crop_path):
+        return Image.open(crop_path)
+
+    box = next(box for box in meta['yolo_boxes'] if box['crop_id'] == crop_idx)
+    dpi = meta.get('dpi', PDF_DPI)
+    render_dpi = max(1, int(round(box.get('crop_dpi', dpi) * scale)))
+    longest_side = max(box['x2'] - box['x1'], box['y2'] - box['y1'])
+    if longest_side > 0:
+        render_dpi = max(1, min(render_dpi, int(CROP_MAX_SIDE * dpi / longest_side)))
+    factor = render_dpi / dpi
+    x1, y1, x2, y2 = (int(round(box[k] * factor)) for k in ('x1', 'y1', 'x2', 'y2'))
+    cache = render_dpi == box.get('crop_dpi', dpi)
+    return get_page_region(upload_id, page_num, render_dpi, (x1, y1, x2, y2), cache=cache)
+
+def crop_image_bytes(upload_id, page_num, crop_idx, scale=1.0):
+    """PNG bytes of a crop, read from disk when a crop file exists"""
+    meta = get_crops_metadata(upload_id, page_num)
+    if not meta or crop_idx >= len(meta['crops']):
+        return None
+
+    crop_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}_page{page_num}_crops", meta['crops'][crop_idx])
+    if scale == 1 and os.path.exists(crop_path):
+        with open(crop_path, 'rb') as f:
+            return f.read()
+
+    crop = load_crop_image(upload_id, page_num, crop_idx, scale)
+    buf = io.BytesIO()
+    crop.save(buf, 'PNG')
+    crop.close()
+    return buf.getvalue()
+
+_ocr_prefetcher = None
+_ocr_prefetcher_lock = threading.Lock()
+
+def _crop_placement(upload_id, page_num, crop_idx):
+    """A crop's box on the sheet and its crop pixels per sheet unit"""
+    meta = get_crops_metadata(upload_id, page_num)
+    box = next((box for box in (meta or {}).get('yolo_boxes', []) if box['crop_id'] == crop_idx), None)
+    if box is None:
+        return None
+    dpi = meta.get('dpi', PDF_DPI)
+    return box, box.get('crop_dpi', dpi) / dpi
+
+def get_ocr_prefetcher():
+    """The process-wide OCR queue, started on first use"""
+    global _ocr_prefetcher
+    with _ocr_prefetcher_lock:
+        if _ocr_prefetcher is None:
+            _ocr_prefetcher = OcrPrefetcher(_crop_placement, crop_image_bytes)
+        return _ocr_prefetcher
+
+def _is_annotated(upload_id, page_num, crop_idx):
+    return os.path.exists(os.path.join(ANNOTATIONS_FOLDER, f"{upload_id}_page{page_num}_crop{crop_idx}.json"))
+
+def prioritize_crop_ocr(upload_id, page_num, crop_idx, priority=PRIORITY_PREFETCH):
+    """Queue OCR for a crop, or move it up the queue, unless it's been annotated"""
+    if not _is_annotated(upload_id, page_num, crop_idx):
+        get_ocr_prefetcher().request(upload_id, page_num, crop_idx, priority)
+
+def prefetch_sheet_ocr(upload_id, page_num):
+    """Queue OCR for every figure on a sheet in reading order"""
+    meta = get_crops_metadata(upload_id, page_num)
+    for box in (meta or {}).get('yolo_boxes', []):
+        prioritize_crop_ocr(upload_id, page_num, box['crop_id'])
+
 def run_ocr_on_crop(upload_id, page_num, crop_idx):
     """Run OCR on a specific crop of a PDF page"""
     # Find the crops directory and metadata file
@@ -207,9 +984,10 @@ def run_ocr_on_crop(upload_id, page_num, crop_idx):
     if crop_idx >= len(meta['crops']):
         return None
     
-    img_fn = meta['crops'][crop_idx]
     yolo_boxes = meta['yolo_boxes']
     current_box = next(box for box in yolo_boxes if box['crop_id'] == crop_idx)
+    # Crop pixels per sheet coordinate unit; crops may be rendered sharper
+    crop_scale = current_box.get('crop_dpi', meta.get('dpi', PDF_DPI)) / meta.get('dpi', PDF_DPI)
     
     # Check if we already have annotations for this crop
     annotation_file = os.path.join(ANNOTATIONS_FOLDER, f"{upload_id}_page{page_num}_crop{crop_idx}.json")
@@ -223,8 +1001,8 @@ def run_ocr_on_crop(upload_id, page_num, crop_idx):
             for region in previous_regions:
                 crop_relative_pts = []
                 for pt in region['sheet_pts']:  # Use sheet_pts for stored coordinates
-                    x = pt[0] - current_box['x1']  # Subtract crop's x offset
-                    y = pt[1] - current_box['y1']  # Subtract crop's y offset
+                    x = (pt[0] - current_box['x1']) * crop_scale  # Subtract crop's x offset
+                    y = (pt[1] - current_box['y1']) * crop_scale  # Subtract crop's y offset
                     crop_relative_pts.append([x, y])
                 
                 boxes.append({
@@ -300,106 +1078,103 @@ def run_ocr_on_crop(upload_id, page_num, crop_idx):
     # Run OCR
     boxes = []
     try:
-        cv_client, OperationStatusCodes = get_cv_client()
-        with open(os.path.join(crops_dir, img_fn), 'rb') as f:
-            resp = cv_client.read_in_stream(f, raw=True)
-        op_id = resp.headers['Operation-Location'].split('/')[-1]
-        while True:
-            result = cv_client.get_read_result(op_id)
-            if result.status not in ('notStarted', 'running'):
-                break
-            time.sleep(1)
-
-        if result.status == OperationStatusCodes.succeeded:
-            idx = 0
+        # Prefetched or earlier text is usually cached; otherwise this crop
+        # jumps the OCR queue, which counts the miss once per crop
+        image_bytes = crop_image_bytes(upload_id, page_num, crop_idx)
+        lines = load_ocr_lines(image_bytes, count_miss=False)
+        if lines is None:
+            lines = get_ocr_prefetcher().request(
+                upload_id, page_num, crop_idx, PRIORITY_VIEWING, image_bytes
+            ).result(timeout=OCR_TIMEOUT)
+
+        idx = 0
+        
+        # First pass - collect all detected text
+        all_detected_text = [line['text'].strip().lower() for line in lines]
+        
+        # Count occurrences of each text
+        text_counts = {}
+        for text in all_detected_text:
+            if text and len(text) > 2:  # Ignore very short text
+                text_counts[text] = text_counts.get(text, 0) + 1
+        
+        # Process each text region
+        idx = 0
+        for line in lines:
+            bb = line['bounding_box']
+            # Keep coordinates relative to the crop for display
+            pts = list(zip(bb[0::2], bb[1::2]))
             
-            # First pass - collect all detected text
-            all_detected_text = []
-            for page in result.analyze_result.read_results:
-                for line in page.lines:
-                    all_detected_text.append(line.text.strip().lower())
+            # Convert quad points to sheet coordinates
+            sheet_coords = []
+            for idx_pt in range(0, len(bb), 2):
+                x = bb[idx_pt] / crop_scale + current_box['x1']  # Add crop's x offset
+                y = bb[idx_pt+1] / crop_scale + current_box['y1']  # Add crop's y offset
+                sheet_coords.extend([x, y])
             
-            # Count occurrences of each text
-            text_counts = {}
-            for text in all_detected_text:
-                if text and len(text) > 2:  # Ignore very short text
-                    text_counts[text] = text_counts.get(text, 0) + 1
+            text = line['text']
+            text_lower = text.strip().lower()
             
-            # Process each text region
-            idx = 0
-            for page in result.analyze_result.read_results:
-                for line in page.lines:
-                    bb = line.bounding_box
-                    # Keep coordinates relative to the crop for display
-                    pts = list(zip(bb[0::2], bb[1::2]))
-                    
-                    # Convert quad points to sheet coordinates
-                    sheet_coords = []
-                    for idx_pt in range(0, len(bb), 2):
-                        x = bb[idx_pt] + current_box['x1']  # Add crop's x offset
-                        y = bb[idx_pt+1] + current_box['y1']  # Add crop's y offset
-                        sheet_coords.extend([x, y])
-                    
-                    text = line.text
-                    text_lower = text.strip().lower()
-                    
-                    # Check if this text has been tagged before
-                    auto_tag = None
-                    auto_bid_item = None
-                    auto_reason = None
-                    auto_source = None
-                    
-                    # Auto-tag based on existing annotations
-                    if text_lower in existing_tags:
-                        auto_tag = existing_tags[text_lower]['tag']
-                        auto_bid_item = existing_tags[text_lower]['bidItem']
-                        auto_reason = existing_tags[text_lower].get('reason', '')
-                        auto_source = existing_tags[text_lower].get('source', '')
-                    
-                    boxes.append({
-                        'id': idx,
-                        'pts': pts,  # Crop-relative coordinates for display
-                        'sheet_pts': list(zip(sheet_coords[0::2], sheet_coords[1::2])),  # Sheet-relative coordinates for storage
-                        'tag': auto_tag,  # Auto-tag if text matches
-                        'bidItem': auto_bid_item,  # Auto-set bid item
-                        'reason': auto_reason,  # Auto-set reason
-                        'crop_box': current_box,
-                        'text': text,
-                        'auto_tagged': True if auto_tag else False,  # Flag for UI to show auto-tagged
-                        'auto_source': auto_source,  # For debugging
-                        'text_count': text_counts.get(text_lower, 0)  # Store count for second pass
-                    })
-                    idx += 1
-            
-            # Second pass - auto-tag repetitive text within the same crop
-            # Find the first manually tagged instance of each repetitive text
-            tagged_text = {}
-            for box in boxes:
-                text_lower = box['text'].strip().lower()
-                if text_lower and box['tag'] and box['text_count'] > 1 and not box.get('auto_tagged', False):
-                    if text_lower not in tagged_text:
-                        tagged_text[text_lower] = {
-                            'tag': box['tag'],
-                            'bidItem': box['bidItem'],
-                            'reason': box.get('reason', '')
-                        }
+            # Check if this text has been tagged before
+            auto_tag = None
+            auto_bid_item = None
+            auto_reason = None
+            auto_source = None
             
-            # Apply tags to other instances of the same text
-            for box in boxes:
-                text_lower = box['text'].strip().lower()
-                if text_lower in tagged_text and not box['tag']:
-                    box['tag'] = tagged_text[text_lower]['tag']
-                    box['bidItem'] = tagged_text[text_lower]['bidItem']
-                    box['reason'] = tagged_text[text_lower]['reason']
-                    box['auto_tagged'] = True
-                    box['auto_source'] = 'same_crop_repetitive_text'
+            # Auto-tag based on existing annotations
+            if text_lower in existing_tags:
+                auto_tag = existing_tags[text_lower]['tag']
+                auto_bid_item = existing_tags[text_lower]['bidItem']
+                auto_reason = existing_tags[text_lower].get('reason', '')
+                auto_source = existing_tags[text_lower].get('source', '')
             
-            # Remove the temporary text_count field
-            for box in boxes:
-                if 'text_count' in box:
-                    del box['text_count']
+            boxes.append({
+                'id': idx,
+                'pts': pts,  # Crop-relative coordinates for display
+                'sheet_pts': list(zip(sheet_coords[0::2], sheet_coords[1::2])),  # Sheet-relative coordinates for storage
+                'tag': auto_tag,  # Auto-tag if text matches
+                'bidItem': auto_bid_item,  # Auto-set bid item
+                'reason': auto_reason,  # Auto-set reason
+                'crop_box': current_box,
+                'text': text,
+                'auto_tagged': True if auto_tag else False,  # Flag for UI to show auto-tagged
+                'auto_source': auto_source,  # For debugging
+                'text_count': text_counts.get(text_lower, 0)  # Store count for second pass
+            })
+            idx += 1
         
+        # Second pass - auto-tag repetitive text within the same crop
+        # Find the first manually tagged instance of each repetitive text
+        tagged_text = {}
+        for box in boxes:
+            text_lower = box['text'].strip().lower()
+            if text_lower and box['tag'] and box['text_count'] > 1 and not box.get('auto_tagged', False):
+                if text_lower not in tagged_text:
+                    tagged_text[text_lower] = {
+                        'tag': box['tag'],
+                        'bidItem': box['bidItem'],
+                        'reason': box.get('reason', '')
+                    }
+        
+        # Apply tags to other instances of the same text
+        for box in boxes:
+            text_lower = box['text'].strip().lower()
+            if text_lower in tagged_text and not box['tag']:
+                box['tag'] = tagged_text[text_lower]['tag']
+                box['bidItem'] = tagged_text[text_lower]['bidItem']
+                box['reason'] = tagged_text[text_lower]['reason']
+                box['auto_tagged'] = True
+                box['auto_source'] = 'same_crop_repetitive_text'
+        
+        # Remove the temporary text_count field
+        for box in boxes:
+            if 'text_count' in box:
+                del box['text_count']
+    
         return boxes
+    except FutureTimeout:
+        print(f"Error running OCR: no result for crop {crop_idx} of page {page_num} after {OCR_TIMEOUT}s")
+        return []
     except Exception as e:
         print(f"Error running OCR: {e}")
         return []
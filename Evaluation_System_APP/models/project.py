@@ -2,7 +2,12 @@ import os
 import json
 from uuid import uuid4
 from datetime import datetime
-from Evaluation_System_APP.config import PROJECTS_FOLDER, UPLOAD_FOLDER, THUMBNAILS_FOLDER, ANNOTATIONS_FOLDER
+from Evaluation_System_APP.config import (
+    PROJECTS_FOLDER, UPLOAD_FOLDER, THUMBNAILS_FOLDER, ANNOTATIONS_FOLDER,
+    DETECTION_MODE, TILE_DPI, TILE_SIZE, TILE_OVERLAP, TILE_NMS_IOU
+)
+from Evaluation_System_APP.models.content_store import unregister_upload
+from Evaluation_System_APP.models.raster_cache import clear_upload_rasters
 
 def get_projects():
     """Load all projects from the projects folder"""
@@ -41,6 +46,57 @@ def create_project(name, description=''):
     
     return True, new_project['id']
 
+# Detection settings a project can override, with their types
+DETECTION_SETTINGS = {
+    'mode': str,
+    'tile_dpi': int,
+    'tile_size': int,
+    'tile_overlap': int,
+    'tile_nms_iou': float
+}
+
+def get_detection_settings(project_id):
+    """Detection settings for a project, falling back to the server defaults"""
+    settings = {
+        'mode': DETECTION_MODE,
+        'tile_dpi': TILE_DPI,
+        'tile_size': TILE_SIZE,
+        'tile_overlap': TILE_OVERLAP,
+        'tile_nms_iou': TILE_NMS_IOU
+    }
+    project = get_project_by_id(project_id) if project_id else None
+    if project:
+        settings.update(project.get('detection', {}))
+    return settings
+
+def update_detection_settings(project_id, values):
+    """Validate and store a project's detection overrides"""
+    projects = get_projects()
+    project = next((p for p in projects if p['id'] == project_id), None)
+    if not project:
+        return False, 'Project not found'
+
+    detection = {}
+    try:
+        for key, cast in DETECTION_SETTINGS.items():
+            if values.get(key) not in (None, ''):
+                detection[key] = cast(values[key])
+    except ValueError:
+        return False, 'Invalid detection setting'
+
+    if detection.get('mode', 'full') not in ('full', 'tiled'):
+        return False, 'Detection mode must be full or tiled'
+    if detection.get('tile_dpi', 1) <= 0 or detection.get('tile_size', 1) <= 0:
+        return False, 'Tile DPI and size must be positive'
+    if not 0 <= detection.get('tile_overlap', 0) < detection.get('tile_size', TILE_SIZE):
+        return False, 'Tile overlap must be smaller than the tile size'
+    if not 0 < detection.get('tile_nms_iou', 0.5) <= 1:
+        return False, 'NMS IoU must be between 0 and 1'
+
+    project['detection'] = detection
+    save_projects(projects)
+    return True, None
+
 def add_pdf_to_project(project_id, upload_id, filename):
     """Add a PDF to a project"""
     projects = get_projects()
@@ -77,6 +133,10 @@ def delete_pdf(project_id, upload_id):
     project['pdfs'] = [pdf for pdf in project['pdfs'] if pdf['upload_id'] != upload_id]
     save_projects(projects)
     
+    # Stop offering this upload's files for reuse; other uploads that
+    # hard-linked them keep their own copies
+    unregister_upload(upload_id)
+    
     # Delete the PDF file
     pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
     if os.path.exists(pdf_path):
@@ -87,6 +147,14 @@ def delete_pdf(project_id, upload_id):
     if os.path.exists(meta_path):
         os.remove(meta_path)
     
+    # Delete background job state files
+    for file in os.listdir(UPLOAD_FOLDER):
+        if file.startswith(f"{upload_id}_") and file.endswith("_job.json"):
+            os.remove(os.path.join(UPLOAD_FOLDER, file))
+    
+    # Delete cached sheet rasters
+    clear_upload_rasters(upload_id)
+    
     # Delete thumbnail directory
     thumbs_dir = os.path.join(THUMBNAILS_FOLDER, upload_id)
     if os.path.exists(thumbs_dir):
@@ -0,0 +1,172 @@
+import io
+import os
+import subprocess
+import threading
+import numpy as np
+from PIL import Image
+from pdf2image import convert_from_path
+from Evaluation_System_APP.config import UPLOAD_FOLDER, RASTER_CACHE_FOLDER, RASTER_CACHE_MB
+
+_cache_lock = threading.Lock()
+# Concurrent misses for the same raster wait on one render; a fixed set of
+# locks picked by hash keeps this from growing with every page
+_render_locks = [threading.Lock() for _ in range(64)]
+# Rasters bigger than the whole budget, which region reads render directly
+_oversized = set()
+# Bytes this process believes the cache holds; the directory is only
+# rescanned once the estimate goes over budget
+_cached_bytes = None
+
+def _raster_path(upload_id, page_num, dpi, grayscale):
+    mode = 'L' if grayscale else 'RGB'
+    return os.path.join(RASTER_CACHE_FOLDER, f"{upload_id}_page{page_num}_{dpi}dpi_{mode}.npy")
+
+def render_page(upload_id, page_num, dpi, grayscale=False):
+    """Rasterize one page of an upload with poppler"""
+    pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
+    return convert_from_path(
+        pdf_path, dpi=dpi,
+        first_page=page_num, last_page=page_num,
+        fmt='PNG', thread_count=1, grayscale=grayscale
+    )[0]
+
+def render_region(upload_id, page_num, dpi, box):
+    """Rasterize just a rectangle of a page, given in pixels at `dpi`
+
+    Poppler only rasterizes the requested area, so a sharp crop costs a
+    fraction of the memory of a full page at the same resolution.
+    """
+    x1, y1, x2, y2 = (int(v) for v in box)
+    pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
+    result = subprocess.run(
+        ['pdftoppm', '-r', str(dpi), '-f', str(page_num), '-l', str(page_num),
+         '-x', str(x1), '-y', str(y1), '-W', str(max(1, x2 - x1)), '-H', str(max(1, y2 - y1)),
+         '-singlefile', pdf_path],
+        capture_output=True, check=True
+    )
+    img = Image.open(io.BytesIO(result.stdout))
+    img.load()
+    return img
+
+def get_page_region(upload_id, page_num, dpi, box, cache=True):
+    """A rectangle of a page at `dpi`, given in pixels at that DPI
+
+    The region is sliced from the cached page raster at the same DPI. On a
+    miss with `cache`, the page is rendered and stored once so the sheet's
+    other figures are cut from it too; otherwise, or with the cache
+    disabled, poppler renders just the region.
+    """
+    x1, y1, x2, y2 = (int(v) for v in box)
+    array = load_raster_array(upload_id, page_num, dpi)
+    if array is not None:
+        return Image.fromarray(np.ascontiguousarray(array[y1:y2, x1:x2]))
+    if not cache or not RASTER_CACHE_MB or _raster_path(upload_id, page_num, dpi, False) in _oversized:
+        return render_region(upload_id, page_num, dpi, box)
+
+    page = get_page_raster(upload_id, page_num, dpi)
+    try:
+        return page.crop((x1, y1, x2, y2))
+    finally:
+        page.close()
+
+def load_raster_array(upload_id, page_num, dpi, grayscale=False):
+    """Memory-map a cached page raster, or None if it isn't cached
+
+    Slicing the array only reads the rows that are touched, so
+    get_page_region cuts a crop out without loading the whole sheet.
+    """
+    path = _raster_path(upload_id, page_num, dpi, grayscale)
+    try:
+        array = np.load(path, mmap_mode='r')
+        # The modification time doubles as the last-used time for eviction
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return array
+
+def store_raster(upload_id, page_num, dpi, img, grayscale=False):
+    """Save a rendered page in the cache, evicting old rasters to stay in budget"""
+    budget = RASTER_CACHE_MB * 1024 * 1024
+    array = np.asarray(img)
+    if not budget:
+        return
+    if array.nbytes > budget:
+        _oversized.add(_raster_path(upload_id, page_num, dpi, grayscale))
+        return
+
+    path = _raster_path(upload_id, page_num, dpi, grayscale)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error caching raster for page {page_num}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    _evict(budget, array.nbytes)
+
+def _evict(budget, added):
+    """Delete least recently used rasters until the cache fits the budget"""
+    global _cached_bytes
+    with _cache_lock:
+        if _cached_bytes is not None:
+            _cached_bytes += added
+            if _cached_bytes <= budget:
+                return
+
+        entries = []
+        for entry in os.scandir(RASTER_CACHE_FOLDER):
+            if entry.name.endswith('.npy'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        _cached_bytes = total
+
+def get_page_raster(upload_id, page_num, dpi, grayscale=False, cache=True):
+    """A page image at the given DPI, rendered only if it isn't cached
+
+    Single-sheet and tiled detection store their renders, so re-detecting
+    a sheet skips poppler, as does get_page_region for virtual crops. Batch
+    processing passes cache=False: it still
+    reads cached rasters, but its one-shot renders aren't stored, as they
+    would only push reusable rasters out of the cache.
+    """
+    array = load_raster_array(upload_id, page_num, dpi, grayscale)
+    if array is not None:
+        return Image.fromarray(np.asarray(array))
+    if not cache:
+        return render_page(upload_id, page_num, dpi, grayscale)
+
+    path = _raster_path(upload_id, page_num, dpi, grayscale)
+    with _render_locks[hash(path) % len(_render_locks)]:
+        # Another request may have rendered it while we waited
+        array = load_raster_array(upload_id, page_num, dpi, grayscale)
+        if array is not None:
+            return Image.fromarray(np.asarray(array))
+        img = render_page(upload_id, page_num, dpi, grayscale)
+        store_raster(upload_id, page_num, dpi, img, grayscale)
+    return img
+
+def clear_upload_rasters(upload_id):
+    """Drop every cached raster of an upload"""
+    prefix = f"{upload_id}_page"
+    for entry in os.scandir(RASTER_CACHE_FOLDER):
+        if entry.name.startswith(prefix):
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,45 @@
+import os
+import fcntl
+from contextlib import contextmanager
+from Evaluation_System_APP.config import UPLOAD_FOLDER
+
+LOCKS_FOLDER = os.path.join(UPLOAD_FOLDER, 'locks')
+
+class SheetBusy(Exception):
+    """Another thread or worker process is already processing the sheet"""
+
+def _lock_path(upload_id, page_num):
+    return os.path.join(LOCKS_FOLDER, f"{upload_id}_page{page_num}.lock")
+
+@contextmanager
+def sheet_lock(upload_id, page_num, blocking=True):
+    """Hold the processing lock of one sheet
+
+    The lock is an flock on a file under the uploads folder, so it holds
+    across gunicorn workers as well as threads, and is released by the OS if
+    the holder dies. Yields True if another caller held the lock first and
+    this one had to wait for it. Raises SheetBusy instead of waiting when
+    `blocking` is False.
+    """
+    os.makedirs(LOCKS_FOLDER, exist_ok=True)
+    with open(_lock_path(upload_id, page_num), 'a') as f:
+        waited = False
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if not blocking:
+                raise SheetBusy(f"Sheet {page_num} is already being processed")
+            fcntl.flock(f, fcntl.LOCK_EX)
+            waited = True
+        try:
+            yield waited
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def is_sheet_locked(upload_id, page_num):
+    """Whether a sheet is being processed right now"""
+    try:
+        with sheet_lock(upload_id, page_num, blocking=False):
+            return False
+    except SheetBusy:
+        return True
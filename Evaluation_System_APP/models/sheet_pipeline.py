@@ -0,0 +1,229 @@
+import time
+import queue
+import threading
+from Evaluation_System_APP.config import (
+    DETECTION_BATCH_SIZE, PIPELINE_QUEUE_SIZE, PIPELINE_ENCODE_WORKERS, PIPELINE_BATCH_WAIT
+)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+class StageStats:
+    """Busy time and throughput of one pipeline stage"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, items=1):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def as_dict(self, elapsed):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'items': self.items,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'mean_seconds': round(self.busy_seconds / self.items, 3) if self.items else None,
+                # Near 1 means this stage is the bottleneck
+                'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else None
+            }
+
+class QueueStats:
+    """Depth samples of a bounded queue between two stages"""
+
+    def __init__(self, q):
+        self.queue = q
+        self.samples = 0
+        self.total_depth = 0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def sample(self):
+        depth = self.queue.qsize()
+        with self._lock:
+            self.samples += 1
+            self.total_depth += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'capacity': self.queue.maxsize,
+                'depth': self.queue.qsize(),
+                'max_depth': self.max_depth,
+                'mean_depth': round(self.total_depth / self.samples, 2) if self.samples else 0
+            }
+
+class SheetPipeline:
+    """Render, detect and crop stages running concurrently on bounded queues
+
+    Poppler renders page N+1 while the model works on page N and the
+    encoders write page N-1's crops. The queue bounds keep only a few page
+    renders in memory however much the stage speeds differ. The rendered
+    queue holds at least a full detection batch so batches can fill up.
+
+    `render(page_num)` returns a page image, `detect(images)` returns boxes
+    for a list of images in one model call, and `write(page_num, boxes)`
+    saves the crops. A failing page is reported and the rest carry on.
+    """
+
+    def __init__(self, pages, render, detect, write, progress=None,
+                 batch_size=None, queue_size=None, encode_workers=None, batch_wait=None):
+        self.pages = list(pages)
+        self.render = render
+        self.detect = detect
+        self.write = write
+        self.progress = progress
+        self.batch_size = batch_size or DETECTION_BATCH_SIZE
+        self.encode_workers = encode_workers or PIPELINE_ENCODE_WORKERS
+        self.batch_wait = PIPELINE_BATCH_WAIT if batch_wait is None else batch_wait
+
+        queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self._rendered = queue.Queue(maxsize=max(queue_size, self.batch_size))
+        self._detected = queue.Queue(maxsize=queue_size)
+        self.stages = {
+            'render': StageStats(1),
+            'detect': StageStats(1),
+            'encode': StageStats(self.encode_workers)
+        }
+        self.queues = {
+            'rendered': QueueStats(self._rendered),
+            'detected': QueueStats(self._detected)
+        }
+        self.errors = []
+        self._started = None
+        self._finished = None
+
+    def run(self):
+        """Process every page; raises the first error when there's no progress tracker"""
+        self._started = time.time()
+        threads = [
+            threading.Thread(target=self._render_stage, name='pipeline-render'),
+            threading.Thread(target=self._detect_stage, name='pipeline-detect')
+        ] + [
+            threading.Thread(target=self._encode_stage, name=f'pipeline-encode-{i}')
+            for i in range(self.encode_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._finished = time.time()
+        self._publish()
+
+        if self.errors and self.progress is None:
+            raise self.errors[0][1]
+        return self.stats()
+
+    def stats(self):
+        """Per-stage timings and queue depths"""
+        elapsed = (self._finished or time.time()) - self._started if self._started else 0
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'stages': {name: stage.as_dict(elapsed) for name, stage in self.stages.items()},
+            'queues': {name: q.as_dict() for name, q in self.queues.items()}
+        }
+
+    def _fail(self, page_num, error):
+        self.errors.append((page_num, error))
+        if self.progress:
+            self.progress.error(f"Page {page_num}: {error}")
+
+    def _publish(self):
+        if self.progress:
+            self.progress.set_stats('pipeline', self.stats())
+
+    def _render_stage(self):
+        for page_num in self.pages:
+            start = time.perf_counter()
+            try:
+                img = self.render(page_num)
+            except Exception as e:
+                self._fail(page_num, e)
+                continue
+            self.stages['render'].record(time.perf_counter() - start)
+            # Blocks while detection is behind, capping renders in memory
+            self._rendered.put((page_num, img))
+            self.queues['rendered'].sample()
+        self._rendered.put(_DONE)
+
+    def _next_batch(self):
+        """Block for one rendered page, then wait briefly for a full batch
+
+        Waiting at most batch_wait seconds for the rest of the batch keeps
+        a fast detector from running small batches one page at a time.
+        """
+        item = self._rendered.get()
+        self.queues['rendered'].sample()
+        if item is _DONE:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self._rendered.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _detect_stage(self):
+        done = False
+        while not done:
+            batch, done = self._next_batch()
+            if not batch:
+                continue
+            pages = [page_num for page_num, _ in batch]
+            images = [img for _, img in batch]
+
+            start = time.perf_counter()
+            try:
+                results = self.detect(images)
+            except Exception as e:
+                for page_num in pages:
+                    self._fail(page_num, e)
+                continue
+            finally:
+                for img in images:
+                    img.close()
+            self.stages['detect'].record(time.perf_counter() - start, len(batch))
+
+            results = list(results)
+            if len(results) != len(pages):
+                # Results can't be matched to pages, so none are trusted
+                error = RuntimeError(f"Detector returned {len(results)} results for {len(pages)} pages")
+                for page_num in pages:
+                    self._fail(page_num, error)
+                continue
+            for page_num, boxes in zip(pages, results):
+                self._detected.put((page_num, boxes))
+                self.queues['detected'].sample()
+
+        for _ in range(self.encode_workers):
+            self._detected.put(_DONE)
+
+    def _encode_stage(self):
+        while True:
+            item = self._detected.get()
+            self.queues['detected'].sample()
+            if item is _DONE:
+                return
+            page_num, boxes = item
+
+            start = time.perf_counter()
+            try:
+                self.write(page_num, boxes)
+            except Exception as e:
+                self._fail(page_num, e)
+                continue
+            self.stages['encode'].record(time.perf_counter() - start)
+            self._publish()
+            if self.progress:
+                self.progress.page_done(page_num)
@@ -0,0 +1,28 @@
+import os
+from Evaluation_System_APP.config import PRELOAD_DETECTOR
+from Evaluation_System_APP.models.pdf_processor import preload_detector, resume_interrupted_ingests, resume_interrupted_sheets
+
+def serves_requests(reloader):
+    """Whether this process handles requests
+
+    Under the debug reloader the first process only watches the code and
+    restarts a child process, which is the one serving.
+    """
+    return not reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+def run_startup_tasks(reloader=False):
+    """Background work to pick up when a serving process starts
+
+    Every worker process of a multi-process server runs this; jobs hold a
+    cross-process lock while they run, so each one still runs only once.
+    """
+    if not serves_requests(reloader):
+        return
+    # Warm up the detector before taking traffic; /ready reports 503 until
+    # a worker is up
+    if PRELOAD_DETECTOR:
+        preload_detector()
+    # Finish thumbnail ingestion and batch sheet processing interrupted by
+    # a crash or restart
+    resume_interrupted_ingests()
+    resume_interrupted_sheets()
@@ -0,0 +1,61 @@
+import os
+import json
+from PIL import Image
+from Evaluation_System_APP.config import (
+    THUMBNAILS_FOLDER, ATLAS_CELL_WIDTH, ATLAS_PAGES_PER_SHEET, ATLAS_COLUMNS
+)
+from Evaluation_System_APP.models.image_encoding import save_image_variants, write_atomic
+
+ATLAS_INDEX = 'atlas.json'
+
+def build_thumbnail_atlases(upload_id, total_pages):
+    """Pack page thumbnails into a few sprite sheets plus a JSON offset index
+
+    The sheet selector loads a handful of atlases instead of one image per
+    page. Only one atlas is held in memory at a time.
+    """
+    thumbs_dir = os.path.join(THUMBNAILS_FOLDER, upload_id)
+    index = {'cell_width': ATLAS_CELL_WIDTH, 'atlases': [], 'pages': {}}
+
+    for first in range(1, total_pages + 1, ATLAS_PAGES_PER_SHEET):
+        pages = range(first, min(first + ATLAS_PAGES_PER_SHEET, total_pages + 1))
+        atlas_idx = len(index['atlases'])
+
+        # Scale every page to the cell width and lay them out in rows
+        cells = []
+        for page_num in pages:
+            with Image.open(os.path.join(thumbs_dir, f"page_{page_num}.png")) as thumb:
+                height = max(1, round(thumb.height * ATLAS_CELL_WIDTH / thumb.width))
+                cells.append((page_num, thumb.convert('RGB').resize((ATLAS_CELL_WIDTH, height))))
+
+        row_tops, y = [], 0
+        for row_start in range(0, len(cells), ATLAS_COLUMNS):
+            row_tops.append(y)
+            y += max(img.height for _, img in cells[row_start:row_start + ATLAS_COLUMNS])
+
+        columns = min(ATLAS_COLUMNS, len(cells))
+        atlas = Image.new('RGB', (columns * ATLAS_CELL_WIDTH, y), 'white')
+        for i, (page_num, img) in enumerate(cells):
+            x = (i % ATLAS_COLUMNS) * ATLAS_CELL_WIDTH
+            top = row_tops[i // ATLAS_COLUMNS]
+            atlas.paste(img, (x, top))
+            index['pages'][str(page_num)] = {
+                'atlas': atlas_idx, 'x': x, 'y': top, 'w': img.width, 'h': img.height
+            }
+            img.close()
+
+        fn = save_image_variants(atlas, os.path.join(thumbs_dir, f"atlas_{atlas_idx}"))
+        index['atlases'].append({'file': fn, 'width': atlas.width, 'height': atlas.height})
+        atlas.close()
+
+    write_atomic(os.path.join(thumbs_dir, ATLAS_INDEX), json.dumps(index).encode('utf8'))
+    return index
+
+def get_thumbnail_atlas(upload_id):
+    """Load the sprite atlas index for an upload, if one was built"""
+    index_path = os.path.join(THUMBNAILS_FOLDER, upload_id, ATLAS_INDEX)
+    if not os.path.exists(index_path):
+        return None
+
+    with open(index_path) as f:
+        return json.load(f)
@@ -0,0 +1,127 @@
+import numpy as np
+
+# Distance in pixels from an inner tile edge at which a box counts as cut off
+SEAM_MARGIN = 4
+
+# Share of the smaller box that must overlap for seam fragments to be fused
+FRAGMENT_OVERLAP = 0.5
+
+# A box this much inside a higher-scoring box is a partial duplicate
+CONTAINED_RATIO = 0.9
+
+def tile_starts(length, tile, overlap):
+    """Start offsets of tiles covering `length` with at least `overlap` shared"""
+    if length <= tile:
+        return [0]
+    stride = max(1, tile - overlap)
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+def tile_grid(width, height, tile, overlap):
+    """Overlapping (x1, y1, x2, y2) tiles covering a page"""
+    return [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in tile_starts(height, tile, overlap)
+        for x in tile_starts(width, tile, overlap)
+    ]
+
+def touches_seam(box, tile, page_size, margin=SEAM_MARGIN):
+    """Whether a tile-relative box is cut off by an edge shared with another tile"""
+    x1, y1, x2, y2 = box
+    tx1, ty1, tx2, ty2 = tile
+    width, height = page_size
+    return bool(
+        (tx1 > 0 and x1 <= margin) or
+        (ty1 > 0 and y1 <= margin) or
+        (tx2 < width and x2 >= tx2 - tx1 - margin) or
+        (ty2 < height and y2 >= ty2 - ty1 - margin)
+    )
+
+def _intersection(box, boxes):
+    w = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    h = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    return w * h
+
+def _area(boxes):
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+def _axis_overlap(box, boxes, lo, hi):
+    """Overlap along one axis as a share of the shorter extent"""
+    overlap = np.clip(np.minimum(box[hi], boxes[:, hi]) - np.maximum(box[lo], boxes[:, lo]), 0, None)
+    shorter = np.minimum(box[hi] - box[lo], boxes[:, hi] - boxes[:, lo])
+    return overlap / np.maximum(shorter, 1e-6)
+
+def _fuse_fragments(boxes, scores, clipped):
+    """Join pieces of one object that were cut apart by tile seams"""
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(boxes)):
+            if not clipped[i]:
+                continue
+            aligned = np.maximum(
+                _axis_overlap(boxes[i], boxes, 0, 2),
+                _axis_overlap(boxes[i], boxes, 1, 3)
+            )
+            inter = _intersection(boxes[i], boxes)
+            # Another cut-off piece lined up along the seam, or a box from a
+            # neighbouring tile that saw the whole object
+            partners = (inter > 0) & (
+                (clipped & (aligned >= FRAGMENT_OVERLAP)) |
+                (inter / max(_area(boxes[i:i + 1])[0], 1e-6) >= CONTAINED_RATIO)
+            )
+            partners[i] = False
+            if not partners.any():
+                continue
+
+            group = np.append(np.nonzero(partners)[0], i)
+            fused = np.concatenate([boxes[group, :2].min(axis=0), boxes[group, 2:].max(axis=0)])
+            keep = np.ones(len(boxes), dtype=bool)
+            keep[group] = False
+            boxes = np.vstack([boxes[keep], fused])
+            scores = np.append(scores[keep], scores[group].max())
+            clipped = np.append(clipped[keep], clipped[group].all())
+            changed = True
+            break
+    return boxes, scores
+
+def nms(boxes, scores, iou_threshold, contained_ratio=CONTAINED_RATIO):
+    """Indices of the boxes kept by greedy non-maximum suppression
+
+    Besides the usual IoU test, a box lying almost entirely inside a
+    higher-scoring one is dropped as a partial duplicate, unless
+    `contained_ratio` is None.
+    """
+    order = np.argsort(-scores)
+    areas = _area(boxes)
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter = _intersection(boxes[i], boxes[rest])
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        survivors = iou < iou_threshold
+        if contained_ratio is not None:
+            survivors &= inter / np.maximum(areas[rest], 1e-6) < contained_ratio
+        order = rest[survivors]
+    return keep
+
+def merge_tile_boxes(boxes, scores, clipped, iou_threshold):
+    """Merge detections from overlapping tiles into one set of page boxes
+
+    Boxes are in page coordinates. `clipped` marks boxes touching an inner
+    tile edge; those are fused with the matching piece from the next tile
+    before duplicates are suppressed. Returns an (N, 4) float array sorted
+    top-to-bottom, left-to-right.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    if not len(boxes):
+        return boxes
+    scores = np.asarray(scores, dtype=float)
+    clipped = np.asarray(clipped, dtype=bool)
+
+    boxes, scores = _fuse_fragments(boxes, scores, clipped)
+    boxes = boxes[nms(boxes, scores, iou_threshold)]
+    return boxes[np.lexsort((boxes[:, 0], boxes[:, 1]))]
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from uuid import uuid4
+from Evaluation_System_APP.config import (
+    UPLOAD_FOLDER, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE, UPLOAD_SESSION_TTL
+)
+
+PDF_MAGIC = b'%PDF-'
+
+# Minimum seconds between sweeps for abandoned upload sessions
+SESSION_SWEEP_INTERVAL = 600
+
+class UploadError(ValueError):
+    """Raised when an upload stream is rejected"""
+
+class UploadTooLarge(UploadError):
+    """Raised when an upload is bigger than allowed or than it announced"""
+
+# Incremental hashers for resumable sessions, rebuilt from the partial file
+# if the process restarted between chunks
+_session_hashers = {}
+_session_locks = {}
+_sessions_guard = threading.Lock()
+_last_sweep = 0.0
+
+def _part_path(upload_id):
+    return os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf.part")
+
+def _session_path(upload_id):
+    return os.path.join(UPLOAD_FOLDER, f"{upload_id}_upload_session.json")
+
+def _copy_stream(stream, out, digest, written, max_bytes):
+    """Copy a stream to an open file in fixed-size chunks while hashing it"""
+    # Streamed bodies may arrive in reads shorter than the magic number, so
+    # the start of the file is held back until it can be checked
+    head = b'' if written == 0 else None
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if head is not None:
+            head += chunk
+            if chunk and len(head) < len(PDF_MAGIC):
+                continue
+            if head and not head.startswith(PDF_MAGIC):
+                raise UploadError('File is not a PDF')
+            chunk, head = head, None
+        if not chunk:
+            return written
+        written += len(chunk)
+        if written > max_bytes:
+            raise UploadTooLarge(f'File exceeds the {max_bytes // (1024 * 1024)} MB upload limit')
+        out.write(chunk)
+        digest.update(chunk)
+
+def save_stream(stream, upload_id, max_bytes=MAX_UPLOAD_BYTES):
+    """Write an upload straight to its final location, returning (path, sha256)"""
+    pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
+    part_path = _part_path(upload_id)
+    digest = hashlib.sha256()
+    try:
+        with open(part_path, 'wb') as out:
+            written = _copy_stream(stream, out, digest, 0, max_bytes)
+        if written == 0:
+            raise UploadError('Empty upload')
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, pdf_path)
+    return pdf_path, digest.hexdigest()
+
+def get_upload_session(upload_id):
+    """Load a resumable upload session"""
+    session_path = _session_path(upload_id)
+    if not os.path.exists(session_path):
+        return None
+    with open(session_path) as f:
+        return json.load(f)
+
+def _save_session(session):
+    session_path = _session_path(session['upload_id'])
+    tmp_path = f"{session_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(session, f, indent=2)
+    os.replace(tmp_path, session_path)
+
+def start_upload_session(project_id, filename, total_size):
+    """Begin a resumable chunked upload"""
+    if total_size <= 0:
+        raise UploadError('Empty upload')
+    if total_size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f'File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit')
+    _maybe_expire_sessions()
+
+    session = {
+        'upload_id': uuid4().hex,
+        'project_id': project_id,
+        'filename': filename,
+        'total_size': total_size,
+        'received': 0,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+        'created_at': time.time()
+    }
+    open(_part_path(session['upload_id']), 'wb').close()
+    _save_session(session)
+    return session
+
+def _session_lock(upload_id):
+    with _sessions_guard:
+        return _session_locks.setdefault(upload_id, threading.Lock())
+
+def _session_hasher(session):
+    """Get the running hash for a session, rehashing the partial file if needed"""
+    upload_id = session['upload_id']
+    digest = _session_hashers.get(upload_id)
+    if digest is None or digest[1] != session['received']:
+        hasher = hashlib.sha256()
+        with open(_part_path(upload_id), 'rb') as f:
+            remaining = session['received']
+            while remaining:
+                chunk = f.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        digest = (hasher, session['received'])
+    return digest[0]
+
+def append_chunk(upload_id, offset, stream):
+    """Append a chunk at `offset`; returns the session with the new offset
+
+    A chunk for the wrong offset is ignored so the client can ask for the
+    current offset and resume from there.
+    """
+    with _session_lock(upload_id):
+        session = get_upload_session(upload_id)
+        if not session:
+            raise UploadError('Unknown upload session')
+        if offset != session['received']:
+            return session, False
+
+        hasher = _session_hasher(session)
+        part_path = _part_path(upload_id)
+        try:
+            with open(part_path, 'r+b') as out:
+                # Drop anything past the confirmed offset from an interrupted chunk
+                out.truncate(offset)
+                out.seek(offset)
+                received = _copy_stream(stream, out, hasher, offset, session['total_size'])
+        except Exception:
+            # The hasher has seen bytes that were never confirmed
+            _session_hashers.pop(upload_id, None)
+            raise
+
+        session['received'] = received
+        _session_hashers[upload_id] = (hasher, received)
+        _save_session(session)
+        return session, True
+
+def finish_upload_session(upload_id):
+    """Move a fully received upload into place, returning (session, path, sha256)"""
+    with _session_lock(upload_id):
+        session = get_upload_session(upload_id)
+        if not session:
+            raise UploadError('Unknown upload session')
+        if session['received'] != session['total_size']:
+            raise UploadError(
+                f"Upload incomplete: {session['received']} of {session['total_size']} bytes"
+            )
+
+        content_hash = _session_hasher(session).hexdigest()
+        pdf_path = os.path.join(UPLOAD_FOLDER, f"{upload_id}.pdf")
+        os.replace(_part_path(upload_id), pdf_path)
+        os.remove(_session_path(upload_id))
+        _session_hashers.pop(upload_id, None)
+
+    with _sessions_guard:
+        _session_locks.pop(upload_id, None)
+    return session, pdf_path, content_hash
+
+def expire_upload_sessions(max_age=UPLOAD_SESSION_TTL):
+    """Delete resumable uploads that haven't received a chunk for `max_age` seconds
+
+    Partial files left by a crashed save_stream have no session and are
+    removed once they are as old. Returns the number of uploads removed.
+    """
+    now = time.time()
+    removed = 0
+    for fn in os.listdir(UPLOAD_FOLDER):
+        if not fn.endswith('.pdf.part'):
+            continue
+        upload_id = fn[:-len('.pdf.part')]
+        with _session_lock(upload_id):
+            paths = [p for p in (_part_path(upload_id), _session_path(upload_id)) if os.path.exists(p)]
+            try:
+                # Every accepted chunk touches the partial file
+                last_active = max(os.path.getmtime(p) for p in paths)
+            except (OSError, ValueError):
+                continue
+            if now - last_active <= max_age:
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            _session_hashers.pop(upload_id, None)
+        with _sessions_guard:
+            _session_locks.pop(upload_id, None)
+        removed += 1
+    return removed
+
+def _maybe_expire_sessions():
+    """Sweep for abandoned uploads now and then, not on every request"""
+    global _last_sweep
+    with _sessions_guard:
+        if time.time() - _last_sweep < SESSION_SWEEP_INTERVAL:
+            return
+        _last_sweep = time.time()
+    try:
+        removed = expire_upload_sessions()
+        if removed:
+            print(f"Removed {removed} abandoned upload(s)")
+    except OSError as e:
+        print(f"Error expiring upload sessions: {e}")
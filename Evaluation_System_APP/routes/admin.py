@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template_string
+from flask import Blueprint, render_template_string, jsonify
 from Evaluation_System_APP.models.project import get_projects
 from Evaluation_System_APP.models.pdf_processor import get_annotations_for_download
+from Evaluation_System_APP.models.ocr_store import ocr_cache_stats
 from .auth import admin_required
 import os
 import json
@@ -302,4 +303,10 @@ def dashboard():
     projects=project_stats, 
     all_scope_stats=all_scope_stats,
     top_scopes=top_scopes,
-    scope_keywords=scope_keywords) 
\ No newline at end of file
+    scope_keywords=scope_keywords) 
+
+@admin_bp.route('/ocr_cache_stats')
+@admin_required
+def ocr_cache_stats_view():
+    """OCR cache hits and misses across all workers"""
+    return jsonify(ocr_cache_stats())
@@ -1,16 +1,26 @@
 from flask import (
     Blueprint, request, redirect, url_for,
-    render_template_string, jsonify, send_from_directory
+    render_template_string, jsonify, send_from_directory, make_response
 )
 from Evaluation_System_APP.models.pdf_processor import (
     get_pdf_metadata, get_page_progress, process_sheet as process_sheet_function,
     get_crops_metadata, run_ocr_on_crop, save_crop_annotations,
-    get_annotations_for_download
+    get_annotations_for_download, ensure_thumbnail, thumbnail_pixel_size, resume_ingest,
+    process_all_sheets as process_all_sheets_function, crop_image_bytes,
+    crops_metadata_complete, SHEET_BUSY, prioritize_crop_ocr
+)
+from Evaluation_System_APP.models.ocr_prefetch import PRIORITY_NEXT
+from Evaluation_System_APP.models.job_queue import get_job_status, is_job_stalled
+from Evaluation_System_APP.models.image_encoding import negotiate_variant
+from Evaluation_System_APP.models.thumbnail_atlas import get_thumbnail_atlas
+from Evaluation_System_APP.config import (
+    UPLOAD_FOLDER, THUMBNAILS_FOLDER, ANNOTATIONS_FOLDER, SCOPES, OCR_PREFETCH
 )
-from Evaluation_System_APP.config import UPLOAD_FOLDER, THUMBNAILS_FOLDER, ANNOTATIONS_FOLDER, SCOPES
 from .auth import login_required, admin_required
 import os
+import re
 import json
+import hashlib
 
 pdf_bp = Blueprint('pdf', __name__)
 
@@ -25,6 +35,34 @@ def select_sheet(upload_id):
     # Calculate completion percentage for each page
     page_progress = get_page_progress(upload_id, meta)
 
+    # Thumbnails may still be coming from the background ingestion job;
+    # uploads from before the job queue have all of them already
+    ingest = get_job_status(upload_id, 'ingest')
+    if ingest:
+        ready_pages = set(ingest['completed_pages'])
+    else:
+        ready_pages = set(range(1, meta['total_pages'] + 1))
+
+    sheets_job = get_job_status(upload_id, 'sheets')
+    # A run cut off by a crash stays 'running' on disk; offer a new one
+    sheets_running = bool(sheets_job) and sheets_job['state'] in ('queued', 'running') \
+        and not is_job_stalled(sheets_job)
+
+    # Interrupted or failed runs can be finished without starting over
+    can_resume = bool(ingest) and (
+        ingest['state'] in ('failed', 'done_with_errors') or is_job_stalled(ingest)
+    )
+
+    # Sprite atlases replace hundreds of thumbnail requests with a handful
+    atlas = get_thumbnail_atlas(upload_id) if not ingest or ingest['state'] == 'done' else None
+
+    # Reserve each thumbnail's box up front so lazy loading only fetches
+    # the cards actually scrolled into view
+    thumb_sizes = {
+        page_num: thumbnail_pixel_size(meta, page_num)
+        for page_num in range(1, meta['total_pages'] + 1)
+    }
+
     return render_template_string("""
     <!doctype html>
     <html>
@@ -37,12 +75,56 @@ def select_sheet(upload_id):
     <body>
         <a href="{{ url_for('project.index') }}" class="nav-link">← Back to Projects</a>
         <h1>{{ meta.filename }} - Select Sheet to Process</h1>
+        {% if can_resume %}
+        <div class="ingest-status has-errors">
+            Thumbnail generation stopped at {{ ingest.pages_done }}/{{ ingest.total_pages }} pages.
+            <form action="{{ url_for('pdf.ingest_resume', upload_id=meta.upload_id) }}" method="post" class="inline-form">
+                <button type="submit" class="btn btn-primary">Resume</button>
+            </form>
+        </div>
+        {% elif ingest and ingest.state in ('queued', 'running') %}
+        <div id="ingestStatus" class="ingest-status">
+            Generating thumbnails: <span id="ingestProgress">{{ ingest.pages_done }}/{{ ingest.total_pages }}</span>
+        </div>
+        {% endif %}
+        <div class="batch-actions">
+            {% if sheets_running %}
+            <div id="sheetsStatus" class="ingest-status">
+                Processing sheets: <span id="sheetsProgress">{{ sheets_job.pages_done }}/{{ sheets_job.total_pages }}</span>
+            </div>
+            {% else %}
+            <form action="{{ url_for('pdf.process_all_sheets', upload_id=meta.upload_id) }}" method="post">
+                Process sheets
+                <input type="number" name="first_page" min="1" max="{{ meta.total_pages }}" value="1">
+                to
+                <input type="number" name="last_page" min="1" max="{{ meta.total_pages }}" value="{{ meta.total_pages }}">
+                <button type="submit" class="btn btn-primary">Process All Sheets</button>
+            </form>
+            {% if sheets_job and sheets_job.errors %}
+            <div class="ingest-status has-errors">Last batch run had errors: {{ sheets_job.errors|join('; ') }}</div>
+            {% elif sheets_job and sheets_job.state in ('queued', 'running') %}
+            <div class="ingest-status has-errors">Last batch run stopped at {{ sheets_job.pages_done }}/{{ sheets_job.total_pages }} sheets.</div>
+            {% endif %}
+            {% endif %}
+        </div>
         <div class="sheets-container">
             {% for i in range(meta.total_pages) %}
             {% set progress = page_progress[i+1] %}
             <div class="sheet-card {% if progress.percent == 100 %}processed{% endif %}">
-                <img src="{{ url_for('pdf.thumbnails', filename=meta.upload_id + '/' + meta.thumbnails[i]) }}" 
-                     alt="Sheet {{ i+1 }}">
+                {% set thumb_url = url_for('pdf.thumbnails', filename=meta.upload_id + '/' + meta.thumbnails[i]) %}
+                {% set thumb_size = thumb_sizes[i+1] %}
+                {% if atlas and atlas.pages[(i+1)|string] %}
+                {% set cell = atlas.pages[(i+1)|string] %}
+                <div class="sheet-sprite" role="img" aria-label="Sheet {{ i+1 }}"
+                     style="background-image: url('{{ url_for('pdf.thumbnails', filename=meta.upload_id + '/' + atlas.atlases[cell.atlas].file) }}');
+                            background-position: -{{ cell.x }}px -{{ cell.y }}px;
+                            width: {{ cell.w }}px; height: {{ cell.h }}px;"></div>
+                {% elif (i+1) in ready_pages %}
+                <img src="{{ thumb_url }}" loading="lazy" data-page="{{ i+1 }}" alt="Sheet {{ i+1 }}"
+                     {% if thumb_size %}width="{{ thumb_size[0] }}" height="{{ thumb_size[1] }}"{% endif %}>
+                {% else %}
+                <img class="pending" data-src="{{ thumb_url }}" data-page="{{ i+1 }}" alt="Sheet {{ i+1 }}">
+                {% endif %}
                 <div class="sheet-info">
                     <strong>Sheet {{ i+1 }}</strong>
                     <div class="progress-bar">
@@ -63,46 +145,130 @@ def select_sheet(upload_id):
             </div>
             {% endfor %}
         </div>
+        {% set poll_ingest = ingest and ingest.state in ('queued', 'running') and not can_resume %}
+        {% if poll_ingest or sheets_running %}
+        <script>
+            const INGEST_STATUS_URL = {{ url_for('pdf.ingest_status', upload_id=meta.upload_id)|tojson if poll_ingest else 'null' }};
+            const SHEETS_STATUS_URL = {{ url_for('pdf.sheets_status', upload_id=meta.upload_id)|tojson if sheets_running else 'null' }};
+        </script>
+        <script src="{{ url_for('static', filename='js/select_sheet.js') }}"></script>
+        {% endif %}
     </body>
     </html>
-    """, meta=meta, page_progress=page_progress)
+    """, meta=meta, page_progress=page_progress, ingest=ingest, ready_pages=ready_pages,
+    thumb_sizes=thumb_sizes, atlas=atlas, can_resume=can_resume,
+    sheets_job=sheets_job, sheets_running=sheets_running)
+
+@pdf_bp.route('/ingest_resume/<upload_id>', methods=['POST'])
+@login_required
+def ingest_resume(upload_id):
+    """Finish the missing thumbnails of an interrupted ingestion"""
+    success, error_message = resume_ingest(upload_id)
+    if not success:
+        return f'Cannot resume ingestion: {error_message}', 409
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(get_job_status(upload_id, 'ingest')), 202
+    return redirect(url_for('pdf.select_sheet', upload_id=upload_id))
+
+@pdf_bp.route('/ingest_status/<upload_id>')
+@login_required
+def ingest_status(upload_id):
+    """Report thumbnail ingestion progress for an upload"""
+    job = get_job_status(upload_id, 'ingest')
+    if job:
+        job['stalled'] = is_job_stalled(job)
+        return jsonify(job)
+
+    meta = get_pdf_metadata(upload_id)
+    if not meta:
+        return jsonify(status='error', message='Invalid upload ID'), 404
+
+    # Uploads from before background ingestion were thumbnailed inline
+    return jsonify(
+        upload_id=upload_id,
+        kind='ingest',
+        state='done',
+        total_pages=meta['total_pages'],
+        pages_done=meta['total_pages'],
+        completed_pages=list(range(1, meta['total_pages'] + 1)),
+        errors=[],
+        eta_seconds=0
+    )
 
 @pdf_bp.route('/process_sheet/<upload_id>/<int:page_num>')
 @login_required
 def process_sheet(upload_id, page_num):
     """Process a sheet from a PDF"""
-    success, error_message = process_sheet_function(upload_id, int(page_num))
+    success, error_message = process_sheet_function(upload_id, int(page_num), wait=False)
     
-    if success:
+    # A double click or a second annotator joins the run already going
+    if success or error_message == SHEET_BUSY:
         return redirect(url_for('pdf.sheet_progress', upload_id=upload_id, page_num=page_num))
     else:
         return f'Error processing sheet: {error_message}', 500
 
+@pdf_bp.route('/process_all_sheets/<upload_id>', methods=['POST'])
+@login_required
+def process_all_sheets(upload_id):
+    """Queue batch detection for a range of sheets"""
+    success, error_message = process_all_sheets_function(
+        upload_id,
+        first_page=request.form.get('first_page', type=int),
+        last_page=request.form.get('last_page', type=int),
+        reprocess=request.form.get('reprocess') == 'true'
+    )
+    if not success:
+        return f'Error processing sheets: {error_message}', 400
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(get_job_status(upload_id, 'sheets')), 202
+    return redirect(url_for('pdf.select_sheet', upload_id=upload_id))
+
+@pdf_bp.route('/sheets_status/<upload_id>')
+@login_required
+def sheets_status(upload_id):
+    """Report progress of batch sheet processing"""
+    job = get_job_status(upload_id, 'sheets')
+    if not job:
+        return jsonify(status='error', message='No batch processing for this upload'), 404
+    # Pollers stop once nothing is working on the job any more
+    job['stalled'] = is_job_stalled(job)
+    return jsonify(job)
+
+def sheet_processing_page(upload_id, page_num):
+    """Page shown while another request processes the sheet; it reloads until done"""
+    return render_template_string("""
+    <!doctype html>
+    <html>
+    <head>
+        <title>Processing Sheet {{ page_num }}</title>
+        <meta http-equiv="refresh" content="3;url={{ url_for('pdf.sheet_progress', upload_id=upload_id, page_num=page_num) }}">
+    </head>
+    <body>
+        <h1>Sheet {{ page_num }} is being processed</h1>
+        <p>Figures are being detected on this sheet. This page will refresh when they're ready.</p>
+        <p><a href="{{ url_for('pdf.select_sheet', upload_id=upload_id) }}">Back to sheet selection</a></p>
+    </body>
+    </html>
+    """, upload_id=upload_id, page_num=page_num)
+
 @pdf_bp.route('/sheet_progress/<upload_id>/<int:page_num>')
 @login_required
 def sheet_progress(upload_id, page_num):
     # Load metadata
     meta = get_crops_metadata(upload_id, page_num)
     
-    # If the sheet hasn't been processed yet, process it directly
-    if not meta:
-        success, error_message = process_sheet_function(upload_id, int(page_num))
+    # If the sheet hasn't been (fully) processed yet, process it directly
+    if not crops_metadata_complete(meta):
+        success, error_message = process_sheet_function(upload_id, int(page_num), wait=False)
+        if error_message == SHEET_BUSY:
+            return sheet_processing_page(upload_id, page_num), 202
         if not success:
             return f'Error processing sheet: {error_message}', 500
         # Reload metadata after processing
         meta = get_crops_metadata(upload_id, page_num)
-        if not meta:
-            return 'Error loading sheet metadata after processing', 500
-    
-    # Ensure all required keys exist
-    if not all(key in meta for key in ['crops', 'completed_crops', 'total_figures']):
-        # If metadata is incomplete, process the sheet directly
-        success, error_message = process_sheet_function(upload_id, int(page_num))
-        if not success:
-            return f'Error processing sheet: {error_message}', 500
-        # Reload metadata after processing
-        meta = get_crops_metadata(upload_id, page_num)
-        if not all(key in meta for key in ['crops', 'completed_crops', 'total_figures']):
+        if not crops_metadata_complete(meta):
             return 'Error: Metadata is still incomplete after processing', 500
     
     # Calculate completion percentage
@@ -171,16 +337,60 @@ def sheet_progress(upload_id, page_num):
     incomplete_figures=[i for i in range(total_figures) if i not in meta.get('completed_crops', [])]
     )
 
+THUMBNAIL_PATH_RE = re.compile(r'^([0-9a-f]+)/page_(\d+)\.png$')
+
 @pdf_bp.route('/thumbnails/<path:filename>')
 @login_required
 def thumbnails(filename):
-    return send_from_directory(THUMBNAILS_FOLDER, filename)
+    # Render missing page thumbnails on demand and cache them on disk
+    if not os.path.exists(os.path.join(THUMBNAILS_FOLDER, filename)):
+        match = THUMBNAIL_PATH_RE.match(filename)
+        if match and not ensure_thumbnail(match.group(1), int(match.group(2))):
+            return 'Thumbnail not available', 404
+
+    # Serve the most compact encoding the browser accepts
+    served = negotiate_variant(THUMBNAILS_FOLDER, filename, request.headers.get('Accept', ''))
+    response = send_from_directory(THUMBNAILS_FOLDER, served)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+CROP_PATH_RE = re.compile(r'^([0-9a-f]+)_page(\d+)_crops/crop_(\d+)\.png$')
 
 @pdf_bp.route('/uploads/<path:filename>')
 @login_required
 def uploaded_file(filename):
+    # Virtual crops have no file; cut them from the cached page raster at
+    # crop DPI instead
+    if not os.path.exists(os.path.join(UPLOAD_FOLDER, filename)):
+        match = CROP_PATH_RE.match(filename)
+        if match:
+            return crop_image(match.group(1), int(match.group(2)), int(match.group(3)))
     return send_from_directory(UPLOAD_FOLDER, filename)
 
+@pdf_bp.route('/crop_image/<upload_id>/<int:page_num>/<int:crop_idx>')
+@login_required
+def crop_image(upload_id, page_num, crop_idx):
+    scale = min(max(request.args.get('scale', 1.0, type=float), 0.1), 4.0)
+    meta = get_crops_metadata(upload_id, page_num)
+    if not meta or crop_idx >= len(meta['crops']):
+        return 'Crop not found', 404
+
+    # The crop's pixels only depend on its box, so that makes a stable ETag
+    box = next(box for box in meta['yolo_boxes'] if box['crop_id'] == crop_idx)
+    etag = hashlib.sha1(
+        json.dumps([upload_id, page_num, box, meta.get('dpi'), scale], sort_keys=True).encode('utf8')
+    ).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(crop_image_bytes(upload_id, page_num, crop_idx, scale))
+        response.mimetype = 'image/png'
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 86400
+    return response
+
 @pdf_bp.route('/annotate_crop/<upload_id>/<int:page_num>/<int:crop_idx>')
 @login_required
 def annotate_crop(upload_id, page_num, crop_idx):
@@ -198,11 +408,18 @@ def annotate_crop(upload_id, page_num, crop_idx):
 
     # Pick this crop
     img_fn = crop_list[crop_idx]
-    image_url = url_for('pdf.uploaded_file', filename=f"{upload_id}_page{page_num}_crops/{img_fn}")
+    if meta.get('storage') == 'virtual':
+        image_url = url_for('pdf.crop_image', upload_id=upload_id, page_num=page_num, crop_idx=crop_idx)
+    else:
+        image_url = url_for('pdf.uploaded_file', filename=f"{upload_id}_page{page_num}_crops/{img_fn}")
     
     # Get current box
     current_box = next(box for box in yolo_boxes if box['crop_id'] == crop_idx)
     
+    # Start on the next figure's text before the annotator gets there
+    if OCR_PREFETCH and crop_idx + 1 < total:
+        prioritize_crop_ocr(upload_id, page_num, crop_idx + 1, PRIORITY_NEXT)
+
     # Run OCR or load previous annotations
     boxes = run_ocr_on_crop(upload_id, page_num, crop_idx) or []
 
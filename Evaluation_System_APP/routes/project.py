@@ -4,9 +4,14 @@ from flask import (
 )
 from Evaluation_System_APP.models.project import (
     get_projects, get_project_by_id, create_project as create_project_model,
-    add_pdf_to_project, delete_pdf
+    add_pdf_to_project, delete_pdf, get_detection_settings, update_detection_settings
 )
-from Evaluation_System_APP.models.pdf_processor import process_uploaded_pdf
+from Evaluation_System_APP.models.pdf_processor import process_uploaded_pdf, ingest_pdf
+from Evaluation_System_APP.models.upload_stream import (
+    UploadError, UploadTooLarge, save_stream, start_upload_session, get_upload_session,
+    append_chunk, finish_upload_session
+)
+from uuid import uuid4
 from .auth import login_required, admin_required
 
 project_bp = Blueprint('project', __name__)
@@ -144,13 +149,37 @@ def view_project(project_id):
 
         <div class="upload-form">
             <h2>Upload New PDF</h2>
-            <form action="{{ url_for('project.upload_pdf', project_id=project.id) }}" 
-                  method="post" enctype="multipart/form-data">
+            <form id="uploadForm" action="{{ url_for('project.upload_pdf', project_id=project.id) }}" 
+                  method="post" enctype="multipart/form-data"
+                  data-chunked-url="{{ url_for('project.start_chunked_upload', project_id=project.id) }}">
                 <input type="file" name="file" accept="application/pdf" required>
                 <button type="submit" class="btn btn-primary">Upload PDF</button>
             </form>
+            <div id="uploadProgress" class="upload-progress" style="display: none;">
+                <div class="progress-bar"><div class="progress-fill" id="uploadProgressFill"></div></div>
+                <div id="uploadProgressText"></div>
+            </div>
         </div>
 
+        {% if session.role == 'admin' %}
+        <div class="upload-form detection-settings">
+            <h2>Detection Settings</h2>
+            <form action="{{ url_for('project.update_detection', project_id=project.id) }}" method="post">
+                <label>Mode
+                    <select name="mode">
+                        <option value="full" {% if detection.mode == 'full' %}selected{% endif %}>Full page</option>
+                        <option value="tiled" {% if detection.mode == 'tiled' %}selected{% endif %}>Tiled</option>
+                    </select>
+                </label>
+                <label>Tile DPI <input type="number" name="tile_dpi" min="1" value="{{ detection.tile_dpi }}"></label>
+                <label>Tile size (px) <input type="number" name="tile_size" min="1" value="{{ detection.tile_size }}"></label>
+                <label>Overlap (px) <input type="number" name="tile_overlap" min="0" value="{{ detection.tile_overlap }}"></label>
+                <label>NMS IoU <input type="number" name="tile_nms_iou" min="0.05" max="1" step="0.05" value="{{ detection.tile_nms_iou }}"></label>
+                <button type="submit" class="btn btn-primary">Save</button>
+            </form>
+        </div>
+        {% endif %}
+
         <div class="pdfs-list">
             <h2>Project PDFs</h2>
             {% if project.pdfs %}
@@ -198,7 +227,17 @@ def view_project(project_id):
         <script src="{{ url_for('static', filename='js/project_view.js') }}"></script>
     </body>
     </html>
-    """, project=project)
+    """, project=project, detection=get_detection_settings(project_id))
+
+@project_bp.route('/project/<project_id>/detection', methods=['POST'])
+@admin_required
+def update_detection(project_id):
+    success, message = update_detection_settings(project_id, request.form)
+
+    if not success:
+        return message, 400
+
+    return redirect(url_for('project.view_project', project_id=project_id))
 
 @project_bp.route('/project/<project_id>/upload', methods=['POST'])
 @login_required
@@ -222,12 +261,142 @@ def upload_pdf(project_id):
         # Update project information
         add_pdf_to_project(project_id, upload_id, file.filename)
 
-        return redirect(url_for('pdf.select_sheet', upload_id=upload_id))
+        return _upload_response(upload_id)
     
+    except UploadTooLarge as e:
+        return str(e), 413
+    except UploadError as e:
+        return str(e), 400
     except Exception as e:
         print(f"Unexpected error during PDF upload: {e}")
         return f"Error uploading PDF: {str(e)}", 500
 
+def _upload_response(upload_id, force_json=False):
+    """Respond to a finished upload while thumbnails build in the background"""
+    # API clients get the upload ID straight away and can poll the status endpoint
+    if force_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify(
+            status='ok',
+            upload_id=upload_id,
+            status_url=url_for('pdf.ingest_status', upload_id=upload_id),
+            redirect_url=url_for('pdf.select_sheet', upload_id=upload_id)
+        ), 202
+
+    return redirect(url_for('pdf.select_sheet', upload_id=upload_id))
+
+@project_bp.route('/project/<project_id>/upload_stream', methods=['POST'])
+@login_required
+def upload_pdf_stream(project_id):
+    """Upload a PDF sent as the raw request body, without multipart spooling"""
+    project = get_project_by_id(project_id)
+    if not project:
+        return jsonify(status='error', message='Project not found'), 404
+
+    filename = request.args.get('filename', '')
+    if not filename.lower().endswith('.pdf'):
+        return jsonify(status='error', message='Please upload a PDF'), 400
+
+    upload_id = uuid4().hex
+    try:
+        pdf_path, content_hash = save_stream(request.stream, upload_id)
+    except UploadTooLarge as e:
+        return jsonify(status='error', message=str(e)), 413
+    except UploadError as e:
+        return jsonify(status='error', message=str(e)), 400
+
+    success, result = ingest_pdf(upload_id, pdf_path, filename, project_id, content_hash)
+    if not success:
+        return jsonify(status='error', message=result), 500
+
+    add_pdf_to_project(project_id, upload_id, filename)
+    return _upload_response(upload_id, force_json=True)
+
+@project_bp.route('/project/<project_id>/uploads', methods=['POST'])
+@login_required
+def start_chunked_upload(project_id):
+    """Start a resumable chunked upload"""
+    project = get_project_by_id(project_id)
+    if not project:
+        return jsonify(status='error', message='Project not found'), 404
+
+    data = request.get_json() or {}
+    filename = data.get('filename', '')
+    if not filename.lower().endswith('.pdf'):
+        return jsonify(status='error', message='Please upload a PDF'), 400
+
+    try:
+        session = start_upload_session(project_id, filename, int(data.get('size', 0)))
+    except UploadTooLarge as e:
+        return jsonify(status='error', message=str(e)), 413
+    except UploadError as e:
+        return jsonify(status='error', message=str(e)), 400
+
+    return jsonify(
+        status='ok',
+        upload_id=session['upload_id'],
+        offset=session['received'],
+        chunk_size=session['chunk_size']
+    )
+
+@project_bp.route('/project/<project_id>/uploads/<upload_id>', methods=['GET'])
+@login_required
+def chunked_upload_status(project_id, upload_id):
+    """Report how many bytes of a chunked upload have been received"""
+    session = get_upload_session(upload_id)
+    if not session or session['project_id'] != project_id:
+        return jsonify(status='error', message='Unknown upload session'), 404
+
+    return jsonify(
+        status='ok',
+        upload_id=upload_id,
+        offset=session['received'],
+        size=session['total_size'],
+        chunk_size=session['chunk_size']
+    )
+
+@project_bp.route('/project/<project_id>/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(project_id, upload_id):
+    """Append one chunk, sent as the raw body, at the given byte offset"""
+    session = get_upload_session(upload_id)
+    if not session or session['project_id'] != project_id:
+        return jsonify(status='error', message='Unknown upload session'), 404
+
+    try:
+        session, accepted = append_chunk(
+            upload_id, request.args.get('offset', type=int, default=-1), request.stream
+        )
+    except UploadTooLarge as e:
+        return jsonify(status='error', message=str(e)), 413
+    except UploadError as e:
+        return jsonify(status='error', message=str(e)), 400
+
+    if not accepted:
+        # Tell the client where to resume from
+        return jsonify(status='error', message='Offset mismatch', offset=session['received']), 409
+
+    return jsonify(status='ok', offset=session['received'])
+
+@project_bp.route('/project/<project_id>/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_chunked_upload(project_id, upload_id):
+    """Finish a chunked upload and queue its ingestion"""
+    session = get_upload_session(upload_id)
+    if not session or session['project_id'] != project_id:
+        return jsonify(status='error', message='Unknown upload session'), 404
+
+    try:
+        session, pdf_path, content_hash = finish_upload_session(upload_id)
+    except UploadError as e:
+        return jsonify(status='error', message=str(e)), 400
+
+    success, result = ingest_pdf(upload_id, pdf_path, session['filename'], project_id, content_hash)
+    if not success:
+        return jsonify(status='error', message=result), 500
+
+    add_pdf_to_project(project_id, upload_id, session['filename'])
+    return _upload_response(upload_id, force_json=True)
+
 @project_bp.route('/project/<project_id>/delete_pdf', methods=['POST'])
 @admin_required
 def delete_pdf_route(project_id):
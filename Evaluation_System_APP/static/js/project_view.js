@@ -15,4 +15,107 @@ window.onclick = function(event) {
     if (event.target == document.getElementById('deleteModal')) {
         hideDeleteModal();
     }
-} 
\ No newline at end of file
+} 
+// Chunked, resumable PDF upload. Large drawing sets go up in pieces so a
+// dropped site connection only costs the chunk in flight.
+const uploadForm = document.getElementById('uploadForm');
+const MAX_CHUNK_RETRIES = 8;
+
+function uploadSessionKey(file) {
+    return `pdfUpload:${uploadForm.dataset.chunkedUrl}:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+function showUploadProgress(sent, total, message) {
+    document.getElementById('uploadProgress').style.display = 'block';
+    const percent = total ? Math.floor((sent / total) * 100) : 0;
+    document.getElementById('uploadProgressFill').style.width = `${percent}%`;
+    document.getElementById('uploadProgressText').textContent = message || `Uploaded ${percent}%`;
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+async function jsonRequest(url, options) {
+    const response = await fetch(url, Object.assign({ credentials: 'same-origin' }, options));
+    const body = await response.json().catch(() => ({}));
+    return { response, body };
+}
+
+async function startOrResumeSession(file) {
+    const saved = localStorage.getItem(uploadSessionKey(file));
+    if (saved) {
+        const { response, body } = await jsonRequest(`${uploadForm.dataset.chunkedUrl}/${saved}`);
+        if (response.ok) return body;
+        localStorage.removeItem(uploadSessionKey(file));
+    }
+
+    const { response, body } = await jsonRequest(uploadForm.dataset.chunkedUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size })
+    });
+    if (!response.ok) throw new Error(body.message || 'Could not start upload');
+    localStorage.setItem(uploadSessionKey(file), body.upload_id);
+    return body;
+}
+
+async function sendChunks(file, session) {
+    const sessionUrl = `${uploadForm.dataset.chunkedUrl}/${session.upload_id}`;
+    let offset = session.offset;
+    let retries = 0;
+
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + session.chunk_size);
+        try {
+            const { response, body } = await jsonRequest(`${sessionUrl}?offset=${offset}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: chunk
+            });
+            if (response.ok || response.status === 409) {
+                // 409 means the server has a different offset; resume from it
+                offset = body.offset;
+                retries = 0;
+                showUploadProgress(offset, file.size);
+                continue;
+            }
+            if (response.status < 500) throw new Error(body.message || 'Upload rejected');
+        } catch (err) {
+            if (err.message && !(err instanceof TypeError)) throw err;
+        }
+
+        // Network error or server hiccup: back off and ask where to resume
+        if (++retries > MAX_CHUNK_RETRIES) throw new Error('Connection lost, please try again');
+        showUploadProgress(offset, file.size, `Connection problem, retrying (${retries})…`);
+        await sleep(Math.min(30000, 1000 * 2 ** retries));
+        const { response, body } = await jsonRequest(sessionUrl).catch(() => ({ response: { ok: false } }));
+        if (response.ok) offset = body.offset;
+    }
+
+    const { response, body } = await jsonRequest(`${sessionUrl}/complete`, { method: 'POST' });
+    if (!response.ok) throw new Error(body.message || 'Could not finish upload');
+    localStorage.removeItem(uploadSessionKey(file));
+    return body;
+}
+
+if (uploadForm && window.fetch && window.Blob && Blob.prototype.slice) {
+    uploadForm.addEventListener('submit', async event => {
+        event.preventDefault();
+        const file = uploadForm.querySelector('input[type="file"]').files[0];
+        if (!file) return;
+
+        const button = uploadForm.querySelector('button[type="submit"]');
+        button.disabled = true;
+        try {
+            const session = await startOrResumeSession(file);
+            showUploadProgress(session.offset, file.size);
+            const result = await sendChunks(file, session);
+            showUploadProgress(file.size, file.size, 'Upload complete, preparing sheets…');
+            window.location.href = result.redirect_url;
+        } catch (err) {
+            showUploadProgress(0, file.size, `Upload failed: ${err.message}`);
+            button.disabled = false;
+        }
+    });
+}
@@ -0,0 +1,79 @@
+// Poll background jobs: swap thumbnails in as ingestion writes them, and
+// track batch sheet processing
+const ingestStatus = document.getElementById('ingestStatus');
+const ingestProgress = document.getElementById('ingestProgress');
+const sheetsProgress = document.getElementById('sheetsProgress');
+const POLL_INTERVAL_MS = 2000;
+
+function showReadyThumbnails(completedPages) {
+    const ready = new Set(completedPages);
+    document.querySelectorAll('img.pending').forEach(img => {
+        if (ready.has(parseInt(img.dataset.page, 10))) {
+            img.src = img.dataset.src;
+            img.classList.remove('pending');
+        }
+    });
+}
+
+function formatEta(seconds) {
+    if (seconds === null || seconds === undefined) return '';
+    if (seconds < 60) return ` (about ${Math.ceil(seconds)}s left)`;
+    return ` (about ${Math.ceil(seconds / 60)} min left)`;
+}
+
+function isRunning(job) {
+    // A stalled job was cut off by a crash and won't make more progress
+    return (job.state === 'queued' || job.state === 'running') && !job.stalled;
+}
+
+function pollIngestStatus() {
+    fetch(INGEST_STATUS_URL, { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(job => {
+            showReadyThumbnails(job.completed_pages || []);
+            ingestProgress.textContent =
+                `${job.pages_done}/${job.total_pages}${formatEta(job.eta_seconds)}`;
+
+            if (isRunning(job)) {
+                setTimeout(pollIngestStatus, POLL_INTERVAL_MS);
+                return;
+            }
+            if (job.stalled) {
+                // Reload to offer resuming the interrupted run
+                window.location.reload();
+                return;
+            }
+
+            // Finished: anything still pending failed to render
+            document.querySelectorAll('img.pending').forEach(img => {
+                img.classList.add('failed');
+            });
+            if (job.errors && job.errors.length) {
+                ingestStatus.classList.add('has-errors');
+                ingestStatus.textContent =
+                    `Thumbnails finished with ${job.errors.length} error(s): ${job.errors.join('; ')}`;
+            } else {
+                ingestStatus.style.display = 'none';
+            }
+        })
+        .catch(() => setTimeout(pollIngestStatus, POLL_INTERVAL_MS));
+}
+
+function pollSheetsStatus() {
+    fetch(SHEETS_STATUS_URL, { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(job => {
+            sheetsProgress.textContent =
+                `${job.pages_done}/${job.total_pages}${formatEta(job.eta_seconds)}`;
+            if (isRunning(job)) {
+                setTimeout(pollSheetsStatus, POLL_INTERVAL_MS);
+            } else {
+                // Reload to show the new per-sheet progress
+                window.location.reload();
+            }
+        })
+        .catch(() => setTimeout(pollSheetsStatus, POLL_INTERVAL_MS));
+}
+
+if (INGEST_STATUS_URL) pollIngestStatus();
+if (SHEETS_STATUS_URL) pollSheetsStatus();
@@ -0,0 +1,157 @@
+"""Background job state, the cross-process job lock and stall detection"""
+import fcntl
+import os
+import threading
+import time
+
+import pytest
+
+from Evaluation_System_APP.models import job_queue
+from Evaluation_System_APP.models.job_queue import (
+    submit_job, get_job_status, save_job_status, is_job_stalled, is_job_running_elsewhere,
+    fail_job
+)
+
+@pytest.fixture(autouse=True)
+def job_folders(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(job_queue, 'LOCKS_FOLDER', str(tmp_path / 'locks'))
+    os.makedirs(tmp_path / 'locks')
+    return tmp_path
+
+def wait_for(upload_id, kind='ingest', timeout=5):
+    """Wait until a job leaves the queued and running states"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = get_job_status(upload_id, kind)
+        if job and job['state'] not in ('queued', 'running') and not job_queue.is_job_active(upload_id, kind):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {upload_id} didn't finish")
+
+def hold_job_lock(upload_id, kind='ingest'):
+    """Take a job's lock through a separate open file, like another process would"""
+    lock_file = open(job_queue._job_lock_path(upload_id, kind), 'a')
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+def pages_job(pages):
+    def target(upload_id, progress=None):
+        for page_num in pages:
+            progress.page_done(page_num)
+    return target
+
+def test_job_runs_and_records_pages():
+    submit_job('a', 'ingest', 3, pages_job([1, 2, 3]), 'a')
+    job = wait_for('a')
+    assert job['state'] == 'done'
+    assert job['completed_pages'] == [1, 2, 3]
+    assert job['pages_done'] == 3
+
+def test_failing_job_is_marked_failed():
+    def target(upload_id, progress=None):
+        raise RuntimeError('poppler crashed')
+    submit_job('a', 'ingest', 1, target, 'a')
+    job = wait_for('a')
+    assert job['state'] == 'failed'
+    assert job['errors'] == ['poppler crashed']
+
+def test_page_errors_finish_with_errors():
+    def target(upload_id, progress=None):
+        progress.page_done(1)
+        progress.error('Page 2: unreadable')
+    submit_job('a', 'ingest', 2, target, 'a')
+    assert wait_for('a')['state'] == 'done_with_errors'
+
+def test_duplicate_submission_runs_once():
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def target(upload_id, progress=None):
+        runs.append(upload_id)
+        started.set()
+        release.wait(5)
+
+    submit_job('a', 'ingest', 1, target, 'a')
+    started.wait(5)
+    submit_job('a', 'ingest', 1, target, 'a')
+    release.set()
+    wait_for('a')
+    assert runs == ['a']
+
+def test_job_locked_by_another_process_is_skipped(monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_LOCK_WAIT', 0.1)
+    runs = []
+    lock_file = hold_job_lock('a')
+    try:
+        submit_job('a', 'ingest', 1, lambda upload_id, progress=None: runs.append(upload_id), 'a')
+        deadline = time.time() + 5
+        while job_queue.is_job_active('a', 'ingest') and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        lock_file.close()
+    assert runs == []
+    assert get_job_status('a', 'ingest')['state'] == 'queued'
+
+def test_status_check_during_start_does_not_skip_the_job():
+    # A brief hold, like a status poll probing the lock, only delays the run
+    lock_file = hold_job_lock('a')
+    threading.Timer(0.2, lock_file.close).start()
+    submit_job('a', 'ingest', 1, pages_job([1]), 'a')
+    assert wait_for('a')['state'] == 'done'
+
+def test_running_elsewhere_follows_the_lock():
+    assert not is_job_running_elsewhere('a', 'ingest')
+    lock_file = hold_job_lock('a')
+    try:
+        assert is_job_running_elsewhere('a', 'ingest')
+    finally:
+        lock_file.close()
+    assert not is_job_running_elsewhere('a', 'ingest')
+
+def orphaned_job(age, state='running'):
+    job = {
+        'upload_id': 'a', 'kind': 'ingest', 'state': state, 'total_pages': 3,
+        'pages_done': 1, 'completed_pages': [1], 'errors': ['Page 2: timeout'],
+        'eta_seconds': None, 'queued_at': time.time() - age, 'updated_at': time.time() - age
+    }
+    save_job_status(job)
+    return job
+
+def test_stall_detection():
+    stale = job_queue.JOB_STALL_SECONDS + 10
+    assert is_job_stalled(orphaned_job(stale))
+    assert not is_job_stalled(orphaned_job(0))
+    assert not is_job_stalled(orphaned_job(stale, state='done'))
+
+    lock_file = hold_job_lock('a')
+    try:
+        # Still making progress in another worker process
+        assert not is_job_stalled(orphaned_job(stale))
+    finally:
+        lock_file.close()
+
+def test_resume_keeps_finished_pages_and_clears_errors():
+    orphaned_job(job_queue.JOB_STALL_SECONDS + 10)
+    done = []
+
+    def target(upload_id, progress=None):
+        done.extend(progress.job['completed_pages'])
+        for page_num in (2, 3):
+            progress.page_done(page_num)
+
+    submit_job('a', 'ingest', 3, target, 'a', resume=True)
+    job = wait_for('a')
+    assert done == [1]
+    assert job['state'] == 'done'
+    assert job['completed_pages'] == [1, 2, 3]
+    assert job['resumes'] == 1
+
+def test_fail_job_records_the_reason():
+    orphaned_job(0, state='queued')
+    fail_job('a', 'ingest', 'Interrupted by a restart')
+    job = get_job_status('a', 'ingest')
+    assert job['state'] == 'failed'
+    assert job['errors'][-1] == 'Interrupted by a restart'
+    assert not is_job_stalled(job)
@@ -0,0 +1,130 @@
+"""OCR prefetch queue: cache lookups, miss counting and where results are saved"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Evaluation_System_APP.models import ocr_prefetch
+from Evaluation_System_APP.models.ocr_prefetch import OcrPrefetcher, PRIORITY_VIEWING
+
+class FakeEngine:
+    """Reads crops on its own event loop thread, like OcrEngine"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self._loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def _read(self, image_bytes):
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        return [{'text': image_bytes.decode()}]
+
+    def submit(self, image_bytes):
+        self.calls.append(image_bytes)
+        return asyncio.run_coroutine_threadsafe(self._read(image_bytes), self._loop)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+class FakeStore:
+    def __init__(self):
+        self.lines = {}
+        self.misses = 0
+        self.save_threads = []
+
+    def load(self, image_bytes, count_miss=True):
+        lines = self.lines.get(image_bytes)
+        if lines is None and count_miss:
+            self.misses += 1
+        return lines
+
+    def save(self, image_bytes, lines, crop_box=None, crop_scale=1.0, ocr_seconds=0.0):
+        self.save_threads.append(threading.current_thread())
+        self.lines[image_bytes] = lines
+
+    def miss(self):
+        self.misses += 1
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(ocr_prefetch, 'get_ocr_engine', lambda: engine)
+    yield engine
+    engine.close()
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(ocr_prefetch, 'load_ocr_lines', store.load)
+    monkeypatch.setattr(ocr_prefetch, 'save_ocr_lines', store.save)
+    monkeypatch.setattr(ocr_prefetch, 'record_ocr_miss', store.miss)
+    return store
+
+def make_prefetcher(images):
+    return OcrPrefetcher(lambda *key: ([0, 0, 10, 10], 1.0), lambda *key: images[key])
+
+def test_reads_and_saves_a_crop(engine, store):
+    prefetcher = make_prefetcher({('u', 1, 0): b'a'})
+    assert prefetcher.request('u', 1, 0).result(timeout=5) == [{'text': 'a'}]
+    assert engine.calls == [b'a']
+    assert store.lines[b'a'] == [{'text': 'a'}]
+    assert store.misses == 1
+
+def test_results_are_saved_off_the_engine_loop(engine, store):
+    # Hold the read so its done-callback fires on the loop, not at submit
+    engine.release.clear()
+    prefetcher = make_prefetcher({('u', 1, 0): b'a'})
+    future = prefetcher.request('u', 1, 0)
+    threading.Timer(0.1, engine.release.set).start()
+    future.result(timeout=5)
+    assert store.save_threads and engine.thread not in store.save_threads
+
+def test_cached_crop_skips_the_engine(engine, store):
+    store.lines[b'a'] = [{'text': 'cached'}]
+    prefetcher = make_prefetcher({('u', 1, 0): b'a'})
+    assert prefetcher.request('u', 1, 0).result(timeout=5) == [{'text': 'cached'}]
+    assert engine.calls == []
+    assert store.misses == 0
+
+def test_concurrent_requests_share_one_read(engine, store):
+    engine.release.clear()
+    prefetcher = make_prefetcher({('u', 1, 0): b'a'})
+    first = prefetcher.request('u', 1, 0)
+    second = prefetcher.request('u', 1, 0, PRIORITY_VIEWING, b'a')
+    assert first is second
+    engine.release.set()
+    assert second.result(timeout=5) == [{'text': 'a'}]
+    assert engine.calls == [b'a']
+    assert store.misses == 1
+
+def test_viewing_request_finds_a_prefetch_saved_since_its_miss(engine, store):
+    prefetcher = make_prefetcher({('u', 1, 0): b'a'})
+    prefetcher.request('u', 1, 0).result(timeout=5)
+    # The viewer missed the cache just before the prefetch saved its lines
+    lines = prefetcher.request('u', 1, 0, PRIORITY_VIEWING, b'a').result(timeout=5)
+    assert lines == [{'text': 'a'}]
+    assert engine.calls == [b'a']
+    assert store.misses == 1
+
+def test_cached_viewing_request_settles_a_queued_prefetch(engine, store):
+    engine.release.clear()
+    images = {('u', 1, 0): b'a', ('u', 1, 1): b'b'}
+    prefetcher = OcrPrefetcher(lambda *key: ([0, 0, 10, 10], 1.0), lambda *key: images[key], concurrency=1)
+    running = prefetcher.request('u', 1, 0)
+    while not engine.calls:
+        time.sleep(0.005)
+    # The only slot is taken, so this one stays queued
+    queued = prefetcher.request('u', 1, 1)
+    store.lines[b'b'] = [{'text': 'cached'}]
+    viewing = prefetcher.request('u', 1, 1, PRIORITY_VIEWING, b'b')
+    assert viewing is queued
+    assert viewing.result(timeout=5) == [{'text': 'cached'}]
+    assert prefetcher.queued() == 0
+    engine.release.set()
+    running.result(timeout=5)
+    assert engine.calls == [b'a']
@@ -0,0 +1,80 @@
+"""Parity of the ONNX detector's preprocessing with ultralytics
+
+Run from the repository root:
+
+    python -m pytest Evaluation_System_APP/tests
+
+The comparisons with ultralytics are skipped when it isn't installed.
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+from Evaluation_System_APP.models.onnx_detector import (
+    letterbox, unletterbox_boxes, MODEL_STRIDE, LETTERBOX_FILL
+)
+
+IMGSZ = 640
+# Landscape and portrait sheets, a small image that gets scaled up and one
+# that already fits exactly
+SIZES = [(2200, 1700), (1700, 2200), (300, 180), (640, 640)]
+
+def sample_image(width, height):
+    """Thin lines on white, like a drawing, so resampling differences show"""
+    rng = np.random.default_rng(width * height)
+    array = np.full((height, width, 3), 255, dtype=np.uint8)
+    for _ in range(40):
+        if rng.random() < 0.5:
+            array[rng.integers(height), :] = rng.integers(0, 255, 3)
+        else:
+            array[:, rng.integers(width)] = rng.integers(0, 255, 3)
+    return Image.fromarray(array)
+
+@pytest.mark.parametrize('size', SIZES)
+def test_rectangular_letterbox_pads_to_stride(size):
+    canvas = letterbox(sample_image(*size), IMGSZ, auto=True)
+    height, width = canvas.shape[:2]
+    assert max(height, width) == IMGSZ
+    assert height % MODEL_STRIDE == 0 and width % MODEL_STRIDE == 0
+
+def test_square_letterbox_pads_with_fill():
+    canvas = letterbox(sample_image(2200, 1700), IMGSZ, auto=False)
+    assert canvas.shape == (IMGSZ, IMGSZ, 3)
+    assert tuple(canvas[0, 0]) == LETTERBOX_FILL
+    assert tuple(canvas[-1, -1]) == LETTERBOX_FILL
+
+@pytest.mark.parametrize('size', SIZES)
+def test_boxes_map_back_to_the_image(size):
+    canvas = letterbox(sample_image(*size), IMGSZ, auto=True)
+    input_size = (canvas.shape[1], canvas.shape[0])
+    # The whole image maps back onto itself
+    gain = min(input_size[0] / size[0], input_size[1] / size[1])
+    pad_x, pad_y = (input_size[0] - size[0] * gain) / 2, (input_size[1] - size[1] * gain) / 2
+    on_input = np.array([[pad_x, pad_y, pad_x + size[0] * gain, pad_y + size[1] * gain]])
+    mapped = unletterbox_boxes(on_input, input_size, size)
+    np.testing.assert_allclose(mapped, [[0, 0, size[0], size[1]]], atol=1 / gain)
+
+@pytest.mark.parametrize('auto', [True, False])
+@pytest.mark.parametrize('size', SIZES)
+def test_letterbox_matches_ultralytics(size, auto):
+    augment = pytest.importorskip('ultralytics.data.augment')
+    img = sample_image(*size)
+    # ultralytics letterboxes BGR arrays
+    expected = augment.LetterBox((IMGSZ, IMGSZ), auto=auto, stride=MODEL_STRIDE)(
+        image=np.asarray(img)[..., ::-1]
+    )[..., ::-1]
+
+    canvas = letterbox(img, IMGSZ, auto=auto)
+    assert canvas.shape == expected.shape
+    # OpenCV's fixed-point interpolation can differ from the numpy
+    # fallback by one grey level
+    assert np.abs(canvas.astype(int) - expected.astype(int)).max() <= 1
+
+@pytest.mark.parametrize('size', SIZES)
+def test_box_mapping_matches_ultralytics(size):
+    ops = pytest.importorskip('ultralytics.utils.ops')
+    canvas = letterbox(sample_image(*size), IMGSZ, auto=True)
+    on_input = np.array([[40.0, 60.0, 300.0, 280.0]])
+    expected = ops.scale_boxes(canvas.shape[:2], on_input.copy(), (size[1], size[0]))
+    mapped = unletterbox_boxes(on_input, (canvas.shape[1], canvas.shape[0]), size)
+    np.testing.assert_allclose(mapped, expected, atol=1e-4)
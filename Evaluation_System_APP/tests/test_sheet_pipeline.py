@@ -0,0 +1,137 @@
+"""Batching, error handling and stats of the render/detect/write pipeline"""
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from Evaluation_System_APP.models.sheet_pipeline import SheetPipeline
+
+class FakeProgress:
+    def __init__(self):
+        self.done = []
+        self.errors = []
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def page_done(self, page_num):
+        with self._lock:
+            self.done.append(page_num)
+
+    def error(self, message):
+        with self._lock:
+            self.errors.append(message)
+
+    def set_stats(self, name, stats):
+        self.stats[name] = stats
+
+def render(page_num):
+    return Image.new('L', (8, 8), page_num)
+
+def detect(images):
+    # Each page's "boxes" are its fill value so results can be traced back
+    return [img.getpixel((0, 0)) for img in images]
+
+def run(pages, detect=detect, render=render, progress=None, **kwargs):
+    written = {}
+    lock = threading.Lock()
+
+    def write(page_num, boxes):
+        with lock:
+            written[page_num] = boxes
+
+    kwargs.setdefault('batch_wait', 0.5)
+    SheetPipeline(pages, render, detect, write, progress, **kwargs).run()
+    return written
+
+def test_every_page_is_written_with_its_own_results():
+    progress = FakeProgress()
+    written = run(range(1, 11), progress=progress, batch_size=3)
+    assert written == {p: p for p in range(1, 11)}
+    assert sorted(progress.done) == list(range(1, 11))
+    assert progress.errors == []
+
+def test_batches_fill_up_when_rendering_is_slower_than_detection():
+    sizes = []
+
+    def slow_render(page_num):
+        time.sleep(0.02)
+        return render(page_num)
+
+    def recording_detect(images):
+        sizes.append(len(images))
+        return detect(images)
+
+    run(range(1, 13), detect=recording_detect, render=slow_render, batch_size=4, queue_size=1)
+    assert sizes == [4, 4, 4]
+
+def test_last_short_batch_runs_after_the_wait():
+    sizes = []
+
+    def recording_detect(images):
+        sizes.append(len(images))
+        return detect(images)
+
+    run(range(1, 6), detect=recording_detect, batch_size=4)
+    assert sum(sizes) == 5
+
+def test_failed_render_only_loses_that_page():
+    def flaky_render(page_num):
+        if page_num == 3:
+            raise RuntimeError('poppler crashed')
+        return render(page_num)
+
+    progress = FakeProgress()
+    written = run(range(1, 6), render=flaky_render, progress=progress)
+    assert sorted(written) == [1, 2, 4, 5]
+    assert progress.errors == ['Page 3: poppler crashed']
+
+def test_failed_detection_fails_the_whole_batch():
+    def failing_detect(images):
+        raise RuntimeError('out of memory')
+
+    progress = FakeProgress()
+    written = run(range(1, 4), detect=failing_detect, progress=progress, batch_size=4)
+    assert written == {}
+    assert len(progress.errors) == 3
+
+def test_missing_results_are_reported_not_dropped():
+    def short_detect(images):
+        return detect(images)[:-1]
+
+    progress = FakeProgress()
+    written = run(range(1, 5), detect=short_detect, progress=progress, batch_size=4, queue_size=4)
+    assert written == {}
+    assert sorted(progress.errors) == [
+        f"Page {p}: Detector returned 3 results for 4 pages" for p in range(1, 5)
+    ]
+
+def test_failed_write_is_reported_and_others_continue():
+    progress = FakeProgress()
+    written = {}
+
+    def write(page_num, boxes):
+        if page_num == 2:
+            raise OSError('disk full')
+        written[page_num] = boxes
+
+    SheetPipeline(range(1, 4), render, detect, write, progress, encode_workers=1).run()
+    assert sorted(written) == [1, 3]
+    assert progress.errors == ['Page 2: disk full']
+    assert sorted(progress.done) == [1, 3]
+
+def test_errors_raise_without_a_progress_tracker():
+    def failing_detect(images):
+        raise RuntimeError('out of memory')
+
+    with pytest.raises(RuntimeError, match='out of memory'):
+        run([1, 2], detect=failing_detect)
+
+def test_stats_cover_every_stage():
+    progress = FakeProgress()
+    run(range(1, 5), progress=progress, batch_size=2)
+    stats = progress.stats['pipeline']
+    assert set(stats['stages']) == {'render', 'detect', 'encode'}
+    assert stats['stages']['render']['items'] == 4
+    assert stats['stages']['detect']['items'] == 4
+    assert stats['queues']['rendered']['capacity'] >= 2
@@ -0,0 +1,72 @@
+"""Tile layout and merging of boxes cut apart by tile seams"""
+import numpy as np
+import pytest
+
+from Evaluation_System_APP.models.tiling import (
+    tile_starts, tile_grid, touches_seam, nms, merge_tile_boxes
+)
+
+@pytest.mark.parametrize('length, tile, overlap', [
+    (5000, 1280, 256), (1281, 1280, 256), (3000, 1000, 0), (800, 1280, 256)
+])
+def test_tiles_cover_the_page_with_the_overlap(length, tile, overlap):
+    starts = tile_starts(length, tile, overlap)
+    assert starts[0] == 0
+    assert min(starts[-1] + tile, length) == length
+    for a, b in zip(starts, starts[1:]):
+        assert b - a <= tile - overlap
+        assert b > a
+
+def test_grid_tiles_stay_on_the_page():
+    tiles = tile_grid(3000, 2000, 1280, 256)
+    assert len(tiles) == len(tile_starts(3000, 1280, 256)) * len(tile_starts(2000, 1280, 256))
+    for x1, y1, x2, y2 in tiles:
+        assert 0 <= x1 < x2 <= 3000 and 0 <= y1 < y2 <= 2000
+
+def test_only_inner_edges_count_as_seams():
+    page = (3000, 2000)
+    left_tile, right_tile = (0, 0, 1280, 1280), (1720, 0, 3000, 1280)
+    # On the page border: not cut off
+    assert not touches_seam((0, 100, 200, 300), left_tile, page)
+    assert not touches_seam((1080, 100, 1280, 300), right_tile, page)
+    # Against an edge shared with a neighbouring tile
+    assert touches_seam((1100, 100, 1279, 300), left_tile, page)
+    assert touches_seam((2, 100, 200, 300), right_tile, page)
+    assert not touches_seam((500, 500, 700, 700), left_tile, page)
+
+def test_fragments_across_a_seam_fuse_into_one_box():
+    # One figure from x=1000 to x=1500 split by the seam at x=1280, seen in
+    # two tiles whose overlap starts at x=1024
+    boxes = [(1000, 200, 1280, 600), (1024, 205, 1500, 598)]
+    merged = merge_tile_boxes(boxes, [0.9, 0.8], [True, True], iou_threshold=0.5)
+    np.testing.assert_array_equal(merged, [[1000, 200, 1500, 600]])
+
+def test_whole_box_from_the_neighbouring_tile_absorbs_the_fragment():
+    boxes = [(1000, 200, 1280, 600), (1000, 200, 1500, 600)]
+    merged = merge_tile_boxes(boxes, [0.6, 0.9], [True, False], iou_threshold=0.5)
+    np.testing.assert_array_equal(merged, [[1000, 200, 1500, 600]])
+
+def test_separate_figures_near_a_seam_stay_apart():
+    # Side by side along the seam but not overlapping
+    boxes = [(1000, 200, 1280, 400), (1000, 900, 1280, 1100)]
+    merged = merge_tile_boxes(boxes, [0.9, 0.9], [True, True], iou_threshold=0.5)
+    assert len(merged) == 2
+
+def test_duplicates_from_overlapping_tiles_are_suppressed():
+    boxes = [(100, 100, 400, 400), (102, 101, 401, 399), (120, 120, 380, 380)]
+    merged = merge_tile_boxes(boxes, [0.9, 0.8, 0.7], [False] * 3, iou_threshold=0.5)
+    np.testing.assert_array_equal(merged, [[100, 100, 400, 400]])
+
+def test_merged_boxes_are_in_reading_order():
+    boxes = [(500, 500, 600, 600), (100, 500, 200, 600), (300, 100, 400, 200)]
+    merged = merge_tile_boxes(boxes, [0.9, 0.9, 0.9], [False] * 3, iou_threshold=0.5)
+    np.testing.assert_array_equal(merged[:, :2], [[300, 100], [100, 500], [500, 500]])
+
+def test_no_boxes():
+    assert merge_tile_boxes([], [], [], iou_threshold=0.5).shape == (0, 4)
+
+def test_nms_without_containment_keeps_nested_boxes():
+    boxes = np.array([(0, 0, 100, 100), (10, 10, 50, 50)], dtype=float)
+    scores = np.array([0.9, 0.8])
+    assert nms(boxes, scores, 0.5) == [0]
+    assert sorted(nms(boxes, scores, 0.5, contained_ratio=None)) == [0, 1]
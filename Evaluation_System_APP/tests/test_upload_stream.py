@@ -0,0 +1,105 @@
+"""Upload size limits, PDF magic checks and resumable sessions"""
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from Evaluation_System_APP.models import upload_stream
+from Evaluation_System_APP.models.upload_stream import (
+    UploadError, UploadTooLarge, save_stream, start_upload_session, append_chunk,
+    finish_upload_session, expire_upload_sessions
+)
+
+PDF = b'%PDF-1.7\n' + b'x' * 5000
+
+class TrickleStream:
+    """A body that arrives a few bytes per read, like a slow client"""
+
+    def __init__(self, data, step):
+        self.data = data
+        self.step = step
+
+    def read(self, size=-1):
+        chunk, self.data = self.data[:self.step], self.data[self.step:]
+        return chunk
+
+@pytest.fixture(autouse=True)
+def upload_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_stream, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(upload_stream, 'UPLOAD_CHUNK_SIZE', 1024)
+    # Keep start_upload_session from sweeping during the tests
+    monkeypatch.setattr(upload_stream, '_last_sweep', time.time())
+    return tmp_path
+
+def test_save_stream_writes_the_pdf_and_its_hash(upload_folder):
+    path, digest = save_stream(io.BytesIO(PDF), 'a')
+    assert open(path, 'rb').read() == PDF
+    assert digest == hashlib.sha256(PDF).hexdigest()
+    assert os.listdir(upload_folder) == ['a.pdf']
+
+def test_magic_number_split_across_short_reads_is_accepted():
+    path, _ = save_stream(TrickleStream(PDF, 2), 'a')
+    assert open(path, 'rb').read() == PDF
+
+@pytest.mark.parametrize('body', [b'<html>not a pdf</html>', b'%PD', b'x'])
+def test_non_pdf_is_rejected_and_cleaned_up(upload_folder, body):
+    with pytest.raises(UploadError, match='not a PDF'):
+        save_stream(TrickleStream(body, 1), 'a')
+    assert os.listdir(upload_folder) == []
+
+def test_empty_upload_is_rejected(upload_folder):
+    with pytest.raises(UploadError, match='Empty'):
+        save_stream(io.BytesIO(b''), 'a')
+    assert os.listdir(upload_folder) == []
+
+def test_oversized_stream_raises_too_large(upload_folder):
+    with pytest.raises(UploadTooLarge):
+        save_stream(io.BytesIO(PDF), 'a', max_bytes=len(PDF) - 1)
+    assert os.listdir(upload_folder) == []
+
+def test_session_larger_than_the_limit_is_refused(monkeypatch):
+    monkeypatch.setattr(upload_stream, 'MAX_UPLOAD_BYTES', 100)
+    with pytest.raises(UploadTooLarge):
+        start_upload_session('p', 'big.pdf', 101)
+    with pytest.raises(UploadError):
+        start_upload_session('p', 'empty.pdf', 0)
+
+def test_chunked_upload_resumes_from_the_confirmed_offset():
+    session = start_upload_session('p', 'set.pdf', len(PDF))
+    upload_id = session['upload_id']
+
+    session, accepted = append_chunk(upload_id, 0, io.BytesIO(PDF[:2000]))
+    assert accepted and session['received'] == 2000
+    # A retried chunk for a stale offset is ignored
+    session, accepted = append_chunk(upload_id, 0, io.BytesIO(PDF[:2000]))
+    assert not accepted and session['received'] == 2000
+
+    append_chunk(upload_id, 2000, io.BytesIO(PDF[2000:]))
+    _, path, digest = finish_upload_session(upload_id)
+    assert open(path, 'rb').read() == PDF
+    assert digest == hashlib.sha256(PDF).hexdigest()
+
+def test_chunks_past_the_announced_size_are_refused():
+    session = start_upload_session('p', 'set.pdf', 10)
+    with pytest.raises(UploadTooLarge):
+        append_chunk(session['upload_id'], 0, io.BytesIO(PDF))
+
+def test_unfinished_session_cannot_complete():
+    session = start_upload_session('p', 'set.pdf', len(PDF))
+    append_chunk(session['upload_id'], 0, io.BytesIO(PDF[:100]))
+    with pytest.raises(UploadError, match='incomplete'):
+        finish_upload_session(session['upload_id'])
+
+def test_idle_sessions_expire(upload_folder):
+    stale = start_upload_session('p', 'old.pdf', len(PDF))['upload_id']
+    fresh = start_upload_session('p', 'new.pdf', len(PDF))['upload_id']
+    an_hour_ago = time.time() - 3600
+    for fn in os.listdir(upload_folder):
+        if fn.startswith(stale):
+            os.utime(upload_folder / fn, (an_hour_ago, an_hour_ago))
+
+    assert expire_upload_sessions(max_age=60) == 1
+    assert not any(fn.startswith(stale) for fn in os.listdir(upload_folder))
+    assert any(fn.startswith(fresh) for fn in os.listdir(upload_folder))
@@ -1,6 +1,6 @@
 import os
 import sys
-from flask import Flask, redirect, url_for, request
+from flask import Flask, redirect, url_for, request, jsonify
 from flask_cors import CORS
 from flask_session import Session
 
@@ -43,6 +43,8 @@ from Evaluation_System_APP.routes.project import project_bp
 from Evaluation_System_APP.routes.pdf import pdf_bp
 from Evaluation_System_APP.routes.admin import admin_bp
 from Evaluation_System_APP.models.user import create_default_admin
+from Evaluation_System_APP.models.startup import run_startup_tasks
+from Evaluation_System_APP.models.inference_pool import inference_status
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='')
@@ -53,11 +55,21 @@ app.register_blueprint(admin_bp, url_prefix='')
 # Create default admin on startup
 create_default_admin()
 
+# Resume interrupted jobs and warm up the detector, in the process that
+# will serve requests
+run_startup_tasks(reloader=__name__ == '__main__' and os.getenv('FLASK_DEBUG', 'false').lower() == 'true')
+
 # Add a route for the root URL
 @app.route('/')
 def index():
     return redirect(url_for('auth.login'))
 
+# Readiness check for load balancers
+@app.route('/ready')
+def ready():
+    status = inference_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
     host = os.getenv('HOST', '0.0.0.0')
     port = int(os.getenv('PORT', '9090'))  # Matches Docker exposed port